@@ -0,0 +1,61 @@
+# Shared by the serving apps: model loading, local cache of the content-addressed
+# DictVectorizer and access to the models' own serving adapters
+import os
+import sys
+
+import mlflow
+from mlflow.tracking import MlflowClient
+
+# The content store client lives with the training code, one implementation for both
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "workflow-orchestration")))
+from mlops.utils.artifact_store import DEFAULT_CACHE_DIR as CACHE_DIR, load_run_object
+
+
+def load_dict_vectorizer(client: MlflowClient, run_id, cache_dir=CACHE_DIR):
+    """
+    DictVectorizer of a run. Runs reference it by content hash, so every model version
+    sharing it reuses the same cached file, verified against its digest; runs logged
+    before content addressing keep it under preprocessing/.
+    """
+    return load_run_object(run_id, "dict_vectorizer", client=client, cache_dir=cache_dir)
+
+
+def model_artifact(client: MlflowClient, run_id):
+    """
+    Artifact to serve from a run: the memory-mapped copy when the run logged one (faster
+    startup, and workers share its arrays through the page cache), else the model.
+    MODEL_ARTIFACT forces a given artifact.
+    """
+    return os.getenv("MODEL_ARTIFACT") or (
+        "mmap_model" if any(a.path == "mmap_model" for a in client.list_artifacts(run_id)) else "model"
+    )
+
+
+def load_model(client: MlflowClient, run_id, model_uri=None):
+    """
+    pyfunc model of a run, from the artifact chosen by model_artifact. model_uri, e.g.
+    models:/<name>/<stage>, is loaded instead when the plain model is chosen.
+    """
+    artifact = model_artifact(client, run_id)
+    if artifact == "model" and model_uri:
+        return mlflow.pyfunc.load_model(model_uri)
+
+    return mlflow.pyfunc.load_model(f"{client.get_run(run_id).info.artifact_uri}/{artifact}")
+
+
+def native_model(model):
+    """
+    The object behind a pyfunc model: the estimator of the sklearn flavor, or what the
+    mmap_model loader returned.
+    """
+    native = getattr(model, "_model_impl", model)
+    return getattr(native, "sklearn_model", native)
+
+
+def frame_predictor(model):
+    """
+    predict_frame of a loaded model that predicts straight from the selected features
+    DataFrame, without the DictVectorizer (e.g. the lookup table or the categorical
+    HistGradientBoosting model), or None.
+    """
+    return getattr(native_model(model), "predict_frame", None)
@@ -1,34 +1,30 @@
-
-
-
 # Import necessary libraries
 import mlflow
 import pandas as pd
-import boto3
 import os
-import pickle
+import sys
 from flask import Flask, request, jsonify
+from mlflow.tracking import MlflowClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import artifact_cache
 
 
+# Tracking server of the S3 backend, it knows where the run's vectorizer is stored
+MLFLOW_TRACKING_URI = os.getenv('MLFLOW_TRACKING_URI', 'http://127.0.0.1:5000')
+mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+client = MlflowClient(tracking_uri=MLFLOW_TRACKING_URI)
+
 # Load MLflow model
 RUN_ID = '4d42b1b9f5c341c699fe72d680d49463'
-S3_BUCKET = 'dario-mlflow-models-storage'
-MODEL_PATH = f's3://{S3_BUCKET}/{RUN_ID}/artifacts/model'
-DV_S3_KEY = f'{RUN_ID}/artifacts/preprocessing/dict_vectorizer.bin'
-LOCAL_DV_PATH = 'dict_vectorizer.bin'
-
-# Load MLflow model from S3
-model = mlflow.pyfunc.load_model(MODEL_PATH)
-
-# Download vectorizer from S3 if not already available locally
-if not os.path.exists(LOCAL_DV_PATH):
-    print(f"Downloading vectorizer from s3://{S3_BUCKET}/{DV_S3_KEY}")
-    s3 = boto3.client('s3')
-    s3.download_file(S3_BUCKET, DV_S3_KEY, LOCAL_DV_PATH)
-
-# Load vectorizer from local file
-with open(LOCAL_DV_PATH, 'rb') as f_in:
-    dv = pickle.load(f_in)
+
+# Load MLflow model from S3, the memory-mapped copy when the run logged one;
+# MODEL_ARTIFACT forces a given artifact
+model = artifact_cache.load_model(client, RUN_ID)
+
+# Content-addressed vectorizer, downloaded once per hash and verified; runs logged
+# before content addressing still load preprocessing/dict_vectorizer.bin
+dv = artifact_cache.load_dict_vectorizer(client, RUN_ID)
 
 
 def prepare_features(ride: dict) -> pd.DataFrame:
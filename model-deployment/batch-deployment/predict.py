@@ -8,10 +8,14 @@ import psycopg
 import uuid
 import random
 import os
+import sys
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from mlflow.tracking import MlflowClient
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import artifact_cache
+
 # Config
 MODEL_NAME = "randomforest-reg-v2"
 STAGE = "Production"
@@ -113,26 +117,16 @@ def prepare_features(ride: dict) -> pd.DataFrame:
 
 @task(name="load_dict_vectorizer")
 def load_dict_vectorizer(run_id):
-    # Download 'preprocessing/' folder from the run's artifacts
-    dv_folder_path = mlflow.artifacts.download_artifacts(
-        run_id=run_id,
-        artifact_path="preprocessing"
-    )
-
-    # Build the full path to dict_vectorizer.bin inside the downloaded folder
-    dv_artifact_path = os.path.join(dv_folder_path, "dict_vectorizer.bin")
-
-    # Load and return the DictVectorizer
-    with open(dv_artifact_path, "rb") as f:
-        dv = pickle.load(f)
-    return dv
+    # Cached per content hash and verified, shared by every model version using it
+    return artifact_cache.load_dict_vectorizer(client, run_id)
 
 @task(name="predict_duration")
 def predict_duration(features):
-    model_uri = f"models:/{MODEL_NAME}/{STAGE}"
-    model = mlflow.pyfunc.load_model(model_uri)
-
     run_id = client.get_latest_versions(MODEL_NAME, stages=[STAGE])[0].run_id
+
+    # The memory-mapped copy when the run logged one, MODEL_ARTIFACT forces a given artifact
+    model = artifact_cache.load_model(client, run_id, f"models:/{MODEL_NAME}/{STAGE}")
+
     dv = load_dict_vectorizer(run_id)
 
     X = dv.transform(features.to_dict(orient="records"))
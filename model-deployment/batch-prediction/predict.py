@@ -1,12 +1,18 @@
 # Import necessary libraries
 import mlflow
+import numpy as np
 import os
 import pandas as pd
 import pickle
+import sys
 from flask import Flask, request, jsonify
+from typing import Tuple
 from mlflow.tracking import MlflowClient
 from mlflow import artifacts
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import artifact_cache
+
 
 
 # Set MLflow tracking URI and run ID
@@ -19,24 +25,28 @@ client = MlflowClient(tracking_uri=MLFLOW_TRACKING_URI)
 MODEL_NAME = "randomforest-reg-v2"
 STAGE = "Production"
 logged_model = f"models:/{MODEL_NAME}/{STAGE}"
-model = mlflow.pyfunc.load_model(logged_model)
 
 # Get the run ID of the current production model
 model_version = client.get_latest_versions(name=MODEL_NAME, stages=[STAGE])[0]
 RUN_ID = model_version.run_id
 
-# Download 'preprocessing/' folder from the run's artifacts
-dv_folder_path = mlflow.artifacts.download_artifacts(
-    run_id=RUN_ID,
-    artifact_path="preprocessing"
-)
+# The memory-mapped copy when the run logged one, MODEL_ARTIFACT forces a given artifact
+model = artifact_cache.load_model(client, RUN_ID, logged_model)
+
+# Runs reference their DictVectorizer by content hash; downloads are verified and cached
+# per hash, so a new model version trained with the same vectorizer does not download it again
+dv = artifact_cache.load_dict_vectorizer(client, RUN_ID)
 
-# Build the full path to dict_vectorizer.bin inside the downloaded folder
-dv_artifact_path = os.path.join(dv_folder_path, "dict_vectorizer.bin")
+# Models that decode the selected features themselves skip the vectorizer
+predict_frame = artifact_cache.frame_predictor(model)
 
-# Load the DictVectorizer
-with open(dv_artifact_path, "rb") as f:
-    dv = pickle.load(f)
+# Optional lookup-table tier, e.g. LOOKUP_TABLE_MODEL=lookup-table-reg: rides in a cell
+# the table is certain about are answered from it, the others by the model above
+LOOKUP_TABLE_MODEL = os.getenv("LOOKUP_TABLE_MODEL")
+table = None
+if LOOKUP_TABLE_MODEL:
+    table_uri = f"models:/{LOOKUP_TABLE_MODEL}/{os.getenv('LOOKUP_TABLE_VERSION', 'latest')}"
+    table = artifact_cache.native_model(mlflow.pyfunc.load_model(table_uri))
 
 
 def prepare_features(ride: dict) -> pd.DataFrame:
@@ -77,13 +87,24 @@ def prepare_features(ride: dict) -> pd.DataFrame:
     return df[selected_features]
 
 
-def predict(features: pd.DataFrame) -> float:
+def predict_model(features: pd.DataFrame) -> np.ndarray:
+    if predict_frame is not None:
+        return predict_frame(features)
+
+    X = dv.transform(features.to_dict(orient='records'))
+    return model.predict(X)
+
+
+def predict(features: pd.DataFrame) -> Tuple[float, str]:
     """
-    Predict duration (or any target) using loaded model.
+    Predict duration (or any target) using loaded model, behind the lookup table when
+    one is configured. Also returns the tier that answered.
     """
-    X = dv.transform(features.to_dict(orient='records'))
-    prediction = model.predict(X)
-    return round(prediction[0], 2)
+    if table is not None:
+        prediction, routed = table.predict_frame_routed(features, predict_model)
+        return round(prediction[0], 2), 'model' if routed[0] else 'table'
+
+    return round(predict_model(features)[0], 2), 'model'
 
 
 # Flask app
@@ -97,11 +118,12 @@ def predict_endpoint():
     if features.empty:
         return jsonify({'error': 'Invalid input, check values.'}), 400
 
-    duration = predict(features)
+    duration, tier = predict(features)
 
     result = {
         'duration': duration,
-        'model_id': RUN_ID
+        'model_id': RUN_ID,
+        'tier': tier,
     }
     return jsonify(result)
 
@@ -7,6 +7,7 @@ import logging
 import uuid
 import pytz
 import os
+import sys
 import pandas as pd
 import io
 import psycopg
@@ -15,6 +16,10 @@ from prefect import task, flow
 from evidently import ColumnMapping
 from evidently.report import Report
 from evidently.metrics import ColumnDriftMetric, DatasetDriftMetric, DatasetMissingValuesMetric
+from mlflow.tracking import MlflowClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "model-deployment")))
+import artifact_cache
 warnings.filterwarnings("ignore", message="invalid value encountered in divide")
 
 SEND_TIMEOUT = 10
@@ -79,10 +84,17 @@ create table dummy_metrics (
 
 reference_data = pd.read_parquet("data/reference.parquet")
 
-def load_model_and_vectorizer(model_path, dv_path):
+def load_model_and_vectorizer(model_path, dv_path, run_id=None):
     """
     Load a trained ML model and its corresponding DictVectorizer from local paths.
+    With run_id, both are loaded from that run instead, the way the serving apps do:
+    the memory-mapped model when the run logged one, and the DictVectorizer from the
+    content store cache.
     """
+    if run_id:
+        client = MlflowClient(os.getenv('MLFLOW_TRACKING_URI', 'http://127.0.0.1:5000'))
+        return artifact_cache.load_model(client, run_id), artifact_cache.load_dict_vectorizer(client, run_id)
+
     model = joblib.load(model_path)
     dv = joblib.load(dv_path)
     
@@ -91,9 +103,11 @@ def load_model_and_vectorizer(model_path, dv_path):
 # Define the paths to the model and DictVectorizer
 model_path = 'model/model.pkl'
 dv_path = 'model/dict_vectorizer.bin'
+# Run the model was logged with, to serve it like the deployed apps do
+run_id = os.getenv('MODEL_RUN_ID')
 
 # Load the model and DictVectorizer
-model, dv = load_model_and_vectorizer(model_path, dv_path)
+model, dv = load_model_and_vectorizer(model_path, dv_path, run_id)
 
 
 # Read the whole dataset 
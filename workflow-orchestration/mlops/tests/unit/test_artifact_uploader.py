@@ -0,0 +1,124 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+import boto3
+import numpy as np
+import pytest
+from mlflow import MlflowClient
+from moto import mock_aws
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.linear_model import LinearRegression
+
+from mlops.utils.artifact_store import URI_TAG, log_content_addressed
+from mlops.utils.artifact_uploader import ArtifactUploader
+from mlops.utils.tracking import queue_run_artifacts
+
+BUCKET = "mlflow-test-artifacts"
+MB = 1024 ** 2
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    # Local S3 stand-in, no real credentials or network involved
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("MLFLOW_S3_ENDPOINT_URL", raising=False)
+
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def mlflow_client(tmp_path):
+    return MlflowClient(tracking_uri=f"sqlite:///{tmp_path / 'mlflow.db'}")
+
+
+def create_run(client, artifact_location):
+    experiment_id = client.create_experiment("uploader-test", artifact_location=artifact_location)
+    return client.create_run(experiment_id)
+
+
+def fitted_model():
+    X = np.arange(20, dtype=float).reshape(10, 2)
+    return LinearRegression().fit(X, X.sum(axis=1))
+
+
+def test_large_file_is_uploaded_as_multipart(s3_client, tmp_path):
+    local_dir = tmp_path / "artifacts"
+    local_dir.mkdir()
+    (local_dir / "model.bin").write_bytes(os.urandom(12 * MB))
+
+    with ArtifactUploader(
+        multipart_threshold=5 * MB,
+        multipart_chunksize=5 * MB,
+        s3_client=s3_client,
+    ) as uploader:
+        uploader.upload(str(local_dir), f"s3://{BUCKET}/runs/1/artifacts")
+
+    head = s3_client.head_object(Bucket=BUCKET, Key="runs/1/artifacts/model.bin")
+    assert head["ContentLength"] == 12 * MB
+    # Multipart ETags end with -<number of parts>
+    assert head["ETag"].strip('"').endswith("-3")
+    assert not local_dir.exists()
+
+
+def test_upload_registers_version_then_finishes_run(s3_client, mlflow_client):
+    run = create_run(mlflow_client, f"s3://{BUCKET}/experiments")
+
+    with ArtifactUploader(s3_client=s3_client) as uploader:
+        queue_run_artifacts(uploader, mlflow_client, run, fitted_model(), registered_model_name="uploader-test-model")
+        assert mlflow_client.get_run(run.info.run_id).info.status == "RUNNING"
+
+    assert mlflow_client.get_run(run.info.run_id).info.status == "FINISHED"
+
+    versions = mlflow_client.search_model_versions("name='uploader-test-model'")
+    assert [version.run_id for version in versions] == [run.info.run_id]
+
+    prefix = run.info.artifact_uri.replace(f"s3://{BUCKET}/", "")
+    keys = [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET, Prefix=prefix)["Contents"]]
+    assert f"{prefix}/model/MLmodel" in keys
+
+
+def test_failed_upload_marks_run_failed(s3_client, mlflow_client):
+    run = create_run(mlflow_client, "s3://missing-bucket/experiments")
+
+    uploader = ArtifactUploader(s3_client=s3_client)
+    with pytest.raises(Exception):
+        with uploader:
+            queue_run_artifacts(uploader, mlflow_client, run, fitted_model(), registered_model_name="uploader-test-model")
+
+    assert mlflow_client.get_run(run.info.run_id).info.status == "FAILED"
+    assert mlflow_client.search_model_versions("name='uploader-test-model'") == []
+
+
+def test_dict_vectorizer_is_queued_to_the_content_store(s3_client, mlflow_client):
+    run = create_run(mlflow_client, f"s3://{BUCKET}/experiments")
+    other_run = mlflow_client.create_run(run.info.experiment_id)
+    dv = DictVectorizer().fit([{"PU_DO": "1_2", "trip_miles": 1.0}])
+
+    with ArtifactUploader(max_workers=1, s3_client=s3_client) as uploader:
+        queue_run_artifacts(uploader, mlflow_client, run, fitted_model(), dict_vectorizer=dv)
+        queue_run_artifacts(uploader, mlflow_client, other_run, fitted_model(), dict_vectorizer=dv)
+
+    uri = mlflow_client.get_run(run.info.run_id).data.tags[URI_TAG.format(name="dict_vectorizer")]
+    assert mlflow_client.get_run(other_run.info.run_id).data.tags[URI_TAG.format(name="dict_vectorizer")] == uri
+    assert uri.startswith(f"s3://{BUCKET}/experiments/cas/sha256/")
+
+    # Identical content is stored once
+    keys = [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET, Prefix="experiments/cas/")["Contents"]]
+    assert keys == [uri.replace(f"s3://{BUCKET}/", "")]
+
+
+def test_content_store_put_is_a_lookup_when_already_stored(s3_client, mlflow_client):
+    run = create_run(mlflow_client, f"s3://{BUCKET}/experiments")
+    dv = DictVectorizer().fit([{"PU_DO": "1_2", "trip_miles": 1.0}])
+
+    digest = log_content_addressed(mlflow_client, run.info.run_id, dv, "dict_vectorizer")
+    assert log_content_addressed(mlflow_client, run.info.run_id, dv, "dict_vectorizer") == digest
+
+    keys = [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=BUCKET, Prefix="experiments/cas/")["Contents"]]
+    assert keys == [f"experiments/cas/sha256/{digest[:2]}/{digest}"]
@@ -0,0 +1,73 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+import time
+
+import numpy as np
+import pytest
+import scipy.sparse
+from sklearn.ensemble import RandomForestRegressor
+
+from mlops.utils.models.compact_forest import LARGE_BATCH_ROWS, CompactForest
+
+N_FEATURES = 400
+
+
+@pytest.fixture(scope="module")
+def forest():
+    # One-hot pickup/dropoff zones plus a trip distance, like the DictVectorizer output
+    rng = np.random.default_rng(0)
+    n_rows = 12_000
+    zones = rng.integers(0, N_FEATURES - 1, n_rows)
+    distance = rng.gamma(2, 2, n_rows)
+    X = scipy.sparse.csr_matrix(
+        (
+            np.concatenate([np.ones(n_rows), distance]),
+            (np.tile(np.arange(n_rows), 2), np.concatenate([zones, np.full(n_rows, N_FEATURES - 1)])),
+        ),
+        shape=(n_rows, N_FEATURES),
+    )
+    y = distance * 3 + zones % 7 + rng.normal(0, 1, n_rows)
+
+    model = RandomForestRegressor(
+        n_estimators=20, max_depth=15, min_samples_leaf=3, n_jobs=1, random_state=0,
+    ).fit(X[:7_000], y[:7_000])
+
+    return model, CompactForest.from_sklearn(model), X[7_000:]
+
+
+def best_of(predict, X, repeats=5):
+    predict(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+@pytest.mark.parametrize("n_rows", [1, LARGE_BATCH_ROWS - 1, LARGE_BATCH_ROWS, 5_000])
+def test_predictions_match_sklearn(forest, n_rows):
+    model, compact, X = forest
+
+    np.testing.assert_allclose(compact.predict(X[:n_rows]), model.predict(X[:n_rows]), rtol=1e-5)
+
+
+def test_predictions_match_sklearn_on_dense_input(forest):
+    model, compact, X = forest
+    X_dense = X[:100].toarray()
+
+    np.testing.assert_allclose(compact.predict(X_dense), model.predict(X_dense), rtol=1e-5)
+
+
+@pytest.mark.parametrize("n_rows", [1, 5_000])
+def test_latency_is_not_worse_than_sklearn(forest, n_rows):
+    model, compact, X = forest
+
+    compact_seconds = best_of(compact.predict, X[:n_rows])
+    sklearn_seconds = best_of(model.predict, X[:n_rows])
+
+    # Generous margin: shared CI machines are noisy
+    assert compact_seconds <= 1.5 * sklearn_seconds
@@ -0,0 +1,43 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from mlops.utils import tracking
+from mlops.utils.tracking import TrackingBackend, reset_tracking_timings, track_run, tracking_timings
+
+
+@pytest.fixture
+def backend(tmp_path):
+    reset_tracking_timings()
+    return TrackingBackend(
+        tracking_uri=f"sqlite:///{tmp_path / 'mlflow.db'}",
+        experiment_name="tracking-test",
+        artifact_root=str(tmp_path / "artifacts"),
+    )
+
+
+def fitted_model():
+    X = np.arange(20, dtype=float).reshape(10, 2)
+    return LinearRegression().fit(X, X.sum(axis=1))
+
+
+def test_registered_model_is_looked_up_once(backend):
+    for _ in range(2):
+        track_run(backend, model=fitted_model(), registered_model_name="tracking-test-model")
+
+    client = tracking.get_client(backend.tracking_uri)
+    versions = client.search_model_versions("name='tracking-test-model'")
+    assert sorted(int(version.version) for version in versions) == [1, 2]
+    assert tracking_timings()["get_registered_model"]["calls"] == 1
+
+
+def test_stale_experiment_id_is_resolved_again(backend):
+    run = track_run(backend)
+    tracking._EXPERIMENT_IDS[(backend.tracking_uri, backend.experiment_name)] = "999"
+
+    assert track_run(backend).info.experiment_id == run.info.experiment_id
+    assert tracking._EXPERIMENT_IDS[(backend.tracking_uri, backend.experiment_name)] == run.info.experiment_id
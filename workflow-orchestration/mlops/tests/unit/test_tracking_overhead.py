@@ -0,0 +1,73 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+import pytest
+from mlflow.tracking import MlflowClient
+
+from mlops.utils.tracking import log_run_data
+
+RUNS = 10
+
+# A typical training run: hyperparameters, validation metrics, pipeline tags
+PARAMS = {f"param_{i}": i for i in range(20)}
+METRICS = {f"metric_{i}": i / 10 for i in range(12)}
+TAGS = {f"tag_{i}": f"value_{i}" for i in range(8)}
+
+
+@pytest.fixture
+def sqlite_client(tmp_path):
+    client = MlflowClient(tracking_uri=f"sqlite:///{tmp_path / 'mlflow.db'}")
+    experiment_id = client.create_experiment("tracking-overhead", artifact_location=str(tmp_path / "artifacts"))
+
+    return client, experiment_id
+
+
+def log_runs(client, experiment_id, **kwargs):
+    """
+    Milliseconds per run spent logging in the calling thread, and the logged runs.
+    """
+    seconds = 0.0
+    run_ids = []
+    for _ in range(RUNS):
+        run_id = client.create_run(experiment_id).info.run_id
+        seconds += log_run_data(client, run_id, PARAMS, METRICS, TAGS, **kwargs)
+        run_ids.append(run_id)
+
+    return seconds * 1000 / RUNS, run_ids
+
+
+def run_data(client, run_id):
+    data = client.get_run(run_id).data
+    tags = {key: value for key, value in data.tags.items() if not key.startswith("mlflow.")}
+
+    return data.params, data.metrics, tags
+
+
+def test_batched_logging_stores_the_same_run_data(sqlite_client):
+    client, experiment_id = sqlite_client
+    per_key_run = client.create_run(experiment_id).info.run_id
+    batched_run = client.create_run(experiment_id).info.run_id
+
+    log_run_data(client, per_key_run, PARAMS, METRICS, TAGS, batched=False)
+    log_run_data(client, batched_run, PARAMS, METRICS, TAGS)
+
+    assert run_data(client, batched_run) == run_data(client, per_key_run)
+    assert len(run_data(client, batched_run)[0]) == len(PARAMS)
+
+
+def test_batched_logging_overhead_per_run(sqlite_client):
+    client, experiment_id = sqlite_client
+
+    # Warm up the SQLAlchemy engine and the schema before timing
+    log_runs(client, experiment_id)
+
+    per_key_ms, _ = log_runs(client, experiment_id, batched=False)
+    batched_ms, _ = log_runs(client, experiment_id)
+    print(
+        f"\n{len(PARAMS)} params, {len(METRICS)} metrics, {len(TAGS)} tags on SQLite: "
+        f"{per_key_ms:.1f} ms per run per key, {batched_ms:.1f} ms per run batched"
+    )
+
+    # One transaction instead of one per key; generous margin for noisy CI machines
+    assert batched_ms * 3 <= per_key_ms
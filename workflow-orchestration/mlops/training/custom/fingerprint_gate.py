@@ -0,0 +1,62 @@
+import os
+from typing import Dict, Optional, Union
+
+import mlops.utils.data_preparation.cleaning as data_preparation
+import mlops.utils.hyperparameters.shared as hyperparameters
+from mlops.utils.fingerprint import files_fingerprint
+from mlops.utils.logging_register import find_registered_version
+
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+DEFAULT_REGISTERED_MODEL_NAME = 'randomforest-reg-v2'
+
+
+@custom
+def fingerprint_gate(*args, **kwargs) -> Dict[str, Optional[Union[bool, str]]]:
+    """
+    Fingerprints the raw month of data written by the training_set ingest, the feature
+    preparation code and the hyperparameter space. When a registered model version was
+    trained on the same fingerprint, downstream tuning and training are skipped and
+    point at that version. Without the raw file, the model is always retrained.
+
+    kwargs:
+      - year, month: the month of raw data (same as the ingest block)
+      - dataset_dir: directory of the raw Parquet files
+      - registered_model_name: defaults to randomforest-reg-v2
+      - force_retrain: ignore an existing version
+    """
+    year = kwargs.get('year', 2023)
+    month = kwargs.get('month', 1)
+    dataset_dir = kwargs.get(
+        'dataset_dir', os.path.abspath(os.path.join(os.getcwd(), "..", "Dataset"))
+    )
+    registered_model_name = kwargs.get('registered_model_name', DEFAULT_REGISTERED_MODEL_NAME)
+
+    # Runs downstream of training_set, whose ingest block writes this file
+    raw_path = os.path.join(dataset_dir, f"chicago_taxi_{year}_{month:02d}.parquet")
+    if not os.path.exists(raw_path):
+        print(f"{raw_path} not found, retraining")
+        return dict(input_fingerprint=None, unchanged=False, model_uri=None, run_id=None)
+
+    fingerprint = files_fingerprint(
+        raw_path,
+        os.path.dirname(data_preparation.__file__),
+        hyperparameters.__file__,
+    )
+
+    version = None
+    if not kwargs.get('force_retrain', False):
+        version = find_registered_version(registered_model_name, fingerprint)
+
+    if version:
+        print(f"Inputs unchanged ({fingerprint}), reusing {registered_model_name} v{version.version}")
+    else:
+        print(f"Inputs changed ({fingerprint}), retraining")
+
+    return dict(
+        input_fingerprint=fingerprint,
+        unchanged=version is not None,
+        model_uri=f"models:/{registered_model_name}/{version.version}" if version else None,
+        run_id=version.run_id if version else None,
+    )
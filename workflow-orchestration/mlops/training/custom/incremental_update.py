@@ -0,0 +1,56 @@
+import os
+from typing import Dict
+
+from mlops.utils.logging import track_experiment
+from mlops.utils.models.incremental import update_incremental_model
+
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+
+@custom
+def incremental_update(*args, **kwargs) -> Dict:
+    """
+    Update the incremental model with the monthly files that arrived since the last run,
+    instead of retraining on the full history. Not wired into a pipeline by default.
+
+    kwargs:
+      - dataset_dir: directory of the raw monthly Parquet files
+      - model_dir: where the model and its consumed-shards state live
+      - full_retrain_every: rebuild from nothing every N new shards (default 12)
+      - full_retrain_window: number of latest shards used by a rebuild (default 12)
+    """
+    dataset_dir = kwargs.get(
+        'dataset_dir', os.path.abspath(os.path.join(os.getcwd(), "..", "Dataset"))
+    )
+    model_dir = kwargs.get('model_dir', os.path.abspath('incremental_model'))
+
+    result = update_incremental_model(
+        os.path.join(dataset_dir, 'chicago_taxi_*.parquet'),
+        model_dir,
+        full_retrain_every=kwargs.get('full_retrain_every', 12),
+        full_retrain_window=kwargs.get('full_retrain_window', 12),
+    )
+
+    if not result['new_shards']:
+        print("⏭️ No new shards")
+        return result
+
+    metrics = {
+        f"prequential_rmse_{shard.replace('.parquet', '')}": rmse
+        for shard, rmse in result['prequential_rmse'].items()
+    }
+    print(f"Consumed {result['new_shards']}, full retrain: {result['full_retrain']}, {metrics}")
+
+    track_experiment(
+        model=result['model'],
+        hyperparameters=result['model'].get_params(),
+        metrics=metrics,
+        run_name=f"incremental_{result['new_shards'][-1].replace('.parquet', '')}",
+        block_uuid=kwargs.get("block_uuid"),
+        pipeline_uuid=kwargs.get("pipeline_uuid"),
+        experiment_name="chicago-taxi-experiment",
+        tags={'full_retrain': str(result['full_retrain'])},
+    )
+
+    return result
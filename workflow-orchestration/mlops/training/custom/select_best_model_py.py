@@ -3,9 +3,19 @@ from pandas import Series
 from scipy.sparse._csr import csr_matrix
 from sklearn.base import BaseEstimator
 
+from mlops.utils.models.benchmark import benchmark_model
+
 if 'custom' not in globals():
     from mage_ai.data_preparation.decorators import custom
 
+# Secondary criterion (from the benchmark) per selection objective.
+SELECTION_OBJECTIVES = {
+    'rmse': None,
+    'rmse_then_latency': 'batch_ms',
+    'rmse_then_single_row_latency': 'single_row_ms',
+    'rmse_then_size': 'size_mb',
+}
+
 @custom
 def select_best_model(
     inputs: List[Tuple[
@@ -22,21 +32,58 @@ def select_best_model(
     Series,
     Dict[str, Union[Callable[..., BaseEstimator], str]]
 ]:
+    """
+    kwargs:
+      - selection_objective: 'rmse' (lowest RMSE, default), 'rmse_then_latency',
+        'rmse_then_single_row_latency' or 'rmse_then_size'. The latter pick the
+        fastest / smallest model among those within rmse_tolerance of the best RMSE.
+      - rmse_tolerance: relative RMSE tolerance, e.g. 0.01 for 1% (default)
+      - probe_rows: size of the fixed probe set used for benchmarking (default 1000)
+    """
     if not inputs:
         raise ValueError("No models were provided for selection.")
 
-    # Initialize best model variables
-    best_rmse = float("inf")
-    best_model = None
+    objective = kwargs.get('selection_objective', 'rmse')
+    if objective not in SELECTION_OBJECTIVES:
+        raise ValueError(f"Unknown selection_objective '{objective}', expected one of {list(SELECTION_OBJECTIVES)}")
+
+    rmse_tolerance = kwargs.get('rmse_tolerance', 0.01)
+    probe_rows = kwargs.get('probe_rows', 1000)
 
-    for result in inputs:
-        params, X, y, info = result
-        rmse = info.get("rmse", float("inf"))
-        if rmse < best_rmse:
-            best_rmse = rmse
-            best_model = result
+    # Benchmark every candidate that carries its fitted model on the same probe set
+    X_probe = inputs[0][1][:probe_rows]
+    for params, X, y, info in inputs:
+        model = info.get('model')
+        info['benchmark'] = benchmark_model(model, X_probe) if model is not None else {}
+        print(
+            f"{info.get('name')}: rmse={info.get('rmse', float('inf')):.4f} "
+            + ' '.join(f"{key}={value:.3f}" for key, value in info['benchmark'].items())
+        )
 
-    if best_model is None:
+    valid = [result for result in inputs if result[3].get("rmse", float("inf")) < float("inf")]
+    if not valid:
         raise ValueError("No valid model found in input list.")
 
+    best_rmse = min(result[3]["rmse"] for result in valid)
+    criterion = SELECTION_OBJECTIVES[objective]
+
+    if criterion is None:
+        best_model = next(result for result in valid if result[3]["rmse"] == best_rmse)
+    else:
+        # Among the models within tolerance of the best RMSE, take the cheapest to serve;
+        # unbenchmarked models rank last, ties go to the lower RMSE.
+        candidates = [
+            result for result in valid
+            if result[3]["rmse"] <= best_rmse * (1 + rmse_tolerance)
+        ]
+        best_model = min(
+            candidates,
+            key=lambda result: (
+                result[3]['benchmark'].get(criterion, float("inf")),
+                result[3]["rmse"],
+            ),
+        )
+
+    print(f"Selected {best_model[3].get('name')} by {objective}")
+
     return best_model
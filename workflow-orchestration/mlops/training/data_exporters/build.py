@@ -27,12 +27,16 @@ def export(
     Series,
     Series,
     BaseEstimator,
+    Series,
+    BaseEstimator,
 ]:
     df, df_train, df_val = data
     target = kwargs.get('target', 'duration_minutes')
+    split_on_feature = kwargs.get('split_on_feature', 'trip_start_timestamp')
 
-    # Full dataset
-    X, _, _ = encode_features(select_features(df))
+    # Full dataset, with its own vectorizer: models fitted on X must be described and
+    # served with dv_full, not with the train split's dv
+    X, _, dv_full = encode_features(select_features(df))
     y = df[target]
 
     # Train/val sets
@@ -43,7 +47,10 @@ def export(
     y_train = df_train[target]
     y_val = df_val[target]
 
-    return X, X_train, X_val, y, y_train, y_val, dv
+    # Row timestamps of the full dataset, for time-based cross-validation folds
+    timestamps = df[split_on_feature]
+
+    return X, X_train, X_val, y, y_train, y_val, dv, timestamps, dv_full
 
 
 @test
@@ -0,0 +1,122 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+
+from mlops.utils.logging import track_experiment
+from mlops.utils.models.benchmark import benchmark_model
+
+if 'data_exporter' not in globals():
+    from mage_ai.data_preparation.decorators import data_exporter
+
+# Student models, small enough for high-QPS serving
+STUDENTS = {
+    'shallow_gbm': (GradientBoostingRegressor, dict(n_estimators=100, max_depth=3, learning_rate=0.1, random_state=42)),
+    'pruned_forest': (RandomForestRegressor, dict(n_estimators=10, max_depth=10, min_samples_leaf=5, n_jobs=-1, random_state=42)),
+}
+
+
+@data_exporter
+def distill(
+    teacher: Tuple[Optional[BaseEstimator], Dict],
+    training_set: Dict[str, list],
+    gate: Optional[Dict] = None,
+    **kwargs,
+) -> Tuple[Optional[BaseEstimator], Dict[str, float]]:
+    """
+    Distill the final forest into a small student trained on the forest's predictions
+    over the training data, and log it next to the teacher with RMSE and latency deltas.
+    Skipped when the fingerprint gate found the inputs unchanged.
+
+    kwargs:
+      - student: 'shallow_gbm' (default) or 'pruned_forest'
+      - student_params: overrides of the student's default hyperparameters
+      - student_registered_model_name: register the student under this name
+      - probe_rows: size of the validation probe set used for benchmarking (default 1000)
+    """
+    teacher_model, model_info = teacher
+
+    if not isinstance(teacher_model, (ExtraTreesRegressor, RandomForestRegressor)):
+        print(f"⏭️ Skipping distillation of {model_info.get('name')}, not a forest")
+        return None, {}
+
+    if (gate or model_info.get('gate') or {}).get('unchanged'):
+        print(f"⏭️ Skipping distillation of {model_info.get('name')}, inputs unchanged")
+        return None, {}
+
+    X, _, X_val, _, _, y_val, dv_split = training_set['build'][:7]
+    y_val = pd.to_numeric(y_val, errors="coerce")
+    X_val = X_val[y_val.notna()]
+    y_val = y_val[y_val.notna()]
+
+    # The teacher and the student are fitted on X, encoded by the full-data vectorizer;
+    # re-encode the validation rows with it
+    dv = model_info.get('dv') or dv_split
+    if dv is not dv_split:
+        X_val = dv.transform(dv_split.inverse_transform(X_val))
+
+    student_name = kwargs.get('student', 'shallow_gbm')
+    if student_name not in STUDENTS:
+        raise ValueError(f"Unknown student '{student_name}', expected one of {list(STUDENTS)}")
+
+    student_class, student_params = STUDENTS[student_name]
+    student_params = {**student_params, **kwargs.get('student_params', {})}
+
+    # Soft targets: the teacher's predictions over the data it was trained on
+    student = student_class(**student_params)
+    student.fit(X, teacher_model.predict(X))
+
+    # The teacher was fit on the full dataset, so the validation split is in-sample for it;
+    # the deltas compare the two models on equal footing, not generalization.
+    teacher_pred = teacher_model.predict(X_val)
+    student_pred = student.predict(X_val)
+    teacher_rmse = float(np.sqrt(mean_squared_error(y_val, teacher_pred)))
+    student_rmse = float(np.sqrt(mean_squared_error(y_val, student_pred)))
+
+    X_probe = X_val[:kwargs.get('probe_rows', 1000)]
+    teacher_cost = benchmark_model(teacher_model, X_probe)
+    student_cost = benchmark_model(student, X_probe)
+
+    metrics = dict(
+        rmse=student_rmse,
+        teacher_rmse=teacher_rmse,
+        rmse_delta=student_rmse - teacher_rmse,
+        fidelity_rmse=float(np.sqrt(mean_squared_error(teacher_pred, student_pred))),
+        **student_cost,
+        **{f'teacher_{key}': value for key, value in teacher_cost.items()},
+        **{
+            f'{key}_speedup': teacher_cost[key] / max(student_cost[key], 1e-9)
+            for key in ('single_row_ms', 'batch_ms')
+        },
+        size_ratio=student_cost['size_mb'] / max(teacher_cost['size_mb'], 1e-9),
+    )
+
+    track_experiment(
+        model=student,
+        dict_vectorizer=dv,
+        hyperparameters=student_params,
+        metrics=metrics,
+        run_name=f"distilled_{model_info.get('name')}_{student_name}",
+        registered_model_name=kwargs.get('student_registered_model_name'),
+        block_uuid=kwargs.get("block_uuid"),
+        pipeline_uuid=kwargs.get("pipeline_uuid"),
+        experiment_name="chicago-taxi-experiment",
+        verbosity=True,
+        tags={
+            'teacher_run_id': model_info.get('run_id'),
+            'teacher_model': teacher_model.__class__.__name__,
+            'distillation_student': student_name,
+        },
+    )
+
+    print(
+        f"Distilled {model_info.get('name')} into {student_name}: "
+        f"rmse {teacher_rmse:.4f} -> {student_rmse:.4f}, "
+        f"batch latency x{metrics['batch_ms_speedup']:.1f} faster, "
+        f"size x{metrics['size_ratio']:.3f}"
+    )
+
+    return student, metrics
@@ -0,0 +1,77 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error
+
+from mlops.utils.custom_models.lookup_table import LookupTableRegressor
+from mlops.utils.logging import track_experiment
+from mlops.utils.models.benchmark import benchmark_model
+
+if 'data_exporter' not in globals():
+    from mage_ai.data_preparation.decorators import data_exporter
+
+
+@data_exporter
+def lookup_table(
+    training_set: Dict[str, list],
+    gate: Optional[Dict] = None,
+    **kwargs,
+) -> Tuple[Optional[LookupTableRegressor], Dict[str, float]]:
+    """
+    Build the PU_DO x hour x weekday lookup-table model, score it on the validation
+    split and register it. Skipped when the fingerprint gate found the inputs unchanged.
+
+    kwargs:
+      - min_count: trips needed for a cell to use its own statistics (default 20)
+      - max_relative_spread: IQR / median above which a cell is uncertain (default 0.5)
+      - registered_model_name: defaults to lookup-table-reg
+      - probe_rows: size of the validation probe set used for benchmarking (default 1000)
+    """
+    if (gate or {}).get('unchanged'):
+        print("⏭️ Skipping the lookup table, inputs unchanged")
+        return None, {}
+
+    X, X_train, X_val, y, y_train, y_val, dv = training_set['build'][:7]
+
+    y_train = pd.to_numeric(y_train, errors="coerce")
+    y_val = pd.to_numeric(y_val, errors="coerce")
+    X_train = X_train[y_train.notna()]
+    y_train = y_train[y_train.notna()]
+    X_val = X_val[y_val.notna()]
+    y_val = y_val[y_val.notna()]
+
+    hyperparameters = dict(
+        min_count=kwargs.get('min_count', 20),
+        max_relative_spread=kwargs.get('max_relative_spread', 0.5),
+    )
+    model = LookupTableRegressor(feature_names=list(dv.feature_names_), **hyperparameters)
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_val)
+    uncertain = model.is_uncertain(X_val)
+
+    metrics = dict(
+        rmse=float(np.sqrt(mean_squared_error(y_val, y_pred))),
+        rmse_certain=float(np.sqrt(mean_squared_error(y_val[~uncertain], y_pred[~uncertain])))
+        if not uncertain.all() else float('nan'),
+        uncertain_share=float(uncertain.mean()),
+        cell_coverage=float((model.level_ == 0).mean()),
+        **benchmark_model(model, X_val[:kwargs.get('probe_rows', 1000)]),
+    )
+    print(f"Lookup table: {metrics}")
+
+    track_experiment(
+        model=model,
+        dict_vectorizer=dv,
+        hyperparameters=hyperparameters,
+        metrics=metrics,
+        run_name="final_LookupTableRegressor",
+        registered_model_name=kwargs.get('registered_model_name', 'lookup-table-reg'),
+        block_uuid=kwargs.get("block_uuid"),
+        pipeline_uuid=kwargs.get("pipeline_uuid"),
+        experiment_name="chicago-taxi-experiment",
+        verbosity=True,
+    )
+
+    return model, metrics
@@ -26,8 +26,13 @@ def train(
     model_name = model_info.get('name', model_class.__name__)
     dv = model_info.get('dv', None)
 
+    # Tuning was skipped by the fingerprint gate, the registered model is still current
+    if (model_info.get('gate') or {}).get('unchanged'):
+        print(f"⏭️ Skipping {model_name}, inputs unchanged")
+        return None, model_info
+
     # Train the model on the full dataset
-    model = model_class(**hyperparameters)
+    model = model_class(**hyperparameters, **model_info.get('model_params', {}))
     model.fit(X, y)
 
     # Log to MLflow + Save to S3
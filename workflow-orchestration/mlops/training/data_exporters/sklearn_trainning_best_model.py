@@ -4,7 +4,14 @@ from pandas import Series
 from scipy.sparse._csr import csr_matrix
 from sklearn.base import BaseEstimator
 
-from mlops.utils.logging_register import track_experiment_and_register  
+import mlflow.sklearn
+
+from mlops.utils.custom_models.mmap_model import MMAP_ARTIFACT_PATH, log_mmap_model
+from mlops.utils.logging_register import (
+    DEFAULT_TRACKING_URI,
+    INPUT_FINGERPRINT_TAG,
+    track_experiment_and_register,
+)
 
 if 'data_exporter' not in globals():
     from mage_ai.data_preparation.decorators import data_exporter
@@ -24,18 +31,32 @@ def train(
     model_class = model_info['cls']
     model_name = model_info.get('name', model_class.__name__)
     dv = model_info.get('dv', None)
+    gate = model_info.get('gate') or {}
+
+    # Inputs unchanged since the registered version: point at it instead of retraining
+    if gate.get('unchanged'):
+        if model_class.__name__ != "RandomForestRegressor":
+            print(f"⏭️ Skipping {model_name}, inputs unchanged")
+            return None, model_info
+
+        print(f"⏭️ Reusing {gate['model_uri']}, inputs unchanged")
+        model_info['run_id'] = gate['run_id']
+        # The gate looked the version up in this store, resolve models:/ against it too
+        mlflow.set_tracking_uri(DEFAULT_TRACKING_URI)
+        return mlflow.sklearn.load_model(gate['model_uri']), model_info
 
     # Train the model on the full dataset
-    model = model_class(**hyperparameters)
+    model = model_class(**hyperparameters, **model_info.get('model_params', {}))
     model.fit(X, y)
 
     # Log to MLflow
-    track_experiment_and_register(
+    run = track_experiment_and_register(
         model=model,
         dict_vectorizer=dv,
         hyperparameters=hyperparameters,
         training_set=X,
         training_targets=y,
+        track_datasets=kwargs.get('track_datasets', True),
         run_name=f"final_{model_name}",
         registered_model_name="randomforest-reg-v2",   # <-- Set this only for RF
         register_stage="Production",                # <-- Promote only RF
@@ -43,6 +64,15 @@ def train(
         pipeline_uuid=kwargs.get("pipeline_uuid"),
         experiment_name="chicago-taxi-experiment",  
         verbosity=True,
+        tags={INPUT_FINGERPRINT_TAG: gate['input_fingerprint']} if gate else None,
     )
+    model_info['run_id'] = run.info.run_id
+
+    # Memory-mappable copy for fast startup and page-cache sharing across serving workers;
+    # forests are stored as CompactForest arrays
+    if kwargs.get('log_mmap_model', True):
+        with mlflow.start_run(run_id=run.info.run_id):
+            log_mmap_model(model, compact_forests=kwargs.get('log_compact_model', True))
+            print(f"Logged memory-mappable model to {MMAP_ARTIFACT_PATH}")
 
     return model, model_info
\ No newline at end of file
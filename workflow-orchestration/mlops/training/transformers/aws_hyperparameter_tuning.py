@@ -5,7 +5,9 @@ from pandas import Series
 from scipy.sparse._csr import csr_matrix
 from sklearn.base import BaseEstimator
 
-from mlops.utils.models.sklearn import load_class, tune_hyperparameters
+from mlops.utils.artifact_uploader import ArtifactUploader
+from mlops.utils.models.scheduler import run_model_families, supports_n_jobs
+from mlops.utils.models.sklearn import encoder_params, load_class, tune_hyperparameters
 from mlops.utils.s3_logging import track_experiment_to_s3
 
 if 'transformer' not in globals():
@@ -38,24 +40,34 @@ def hyperparameter_tuning(
     X_val = X_val[y_val.notna()]
     y_val = y_val[y_val.notna()]
 
-    results = []
-
     model_names, _ = model_class_name  # Unpack both model list and metadata
 
-    for name in model_names:
+    def __tune(name: str, n_jobs: int) -> Tuple:
         model_class = load_class(name)
-        best_params, best_rmse = tune_hyperparameters(
+        model_params = dict(n_jobs=n_jobs) if supports_n_jobs(model_class) else {}
+        model_params.update(encoder_params(model_class, dv))
+
+        best_params, best_rmse, model = tune_hyperparameters(
             model_class,
             X_train=X_train,
             y_train=y_train,
             X_val=X_val,
             y_val=y_val,
+            model_params=model_params,
             max_evaluations=kwargs.get('max_evaluations', 50),
             random_state=kwargs.get('random_state', 42),
+            return_best_model=True,
+            grow_forests=kwargs.get('grow_forests', False),
         )
 
-        model = model_class(**best_params)
-        model.fit(X_train, y_train)
+        if model is None:
+            model = model_class(**best_params, **model_params)
+            model.fit(X_train, y_train)
+
+        return best_params, name, best_rmse, model
+
+    def __publish(name: str, result: Tuple) -> None:
+        best_params, _, best_rmse, model = result
 
         track_experiment_to_s3(
             model=model,
@@ -69,8 +81,19 @@ def hyperparameter_tuning(
             pipeline_uuid=kwargs.get('pipeline_uuid'),
             block_uuid=kwargs.get('block_uuid'),
             run_name=f"tuning_{name}",
+            uploader=uploader,
         )
 
-        results.append((best_params, name, best_rmse))
+    # Tune the families concurrently; S3 uploads run in the background and overlap with
+    # the remaining training. Leaving the uploader waits until every run is confirmed.
+    with ArtifactUploader(max_workers=kwargs.get('upload_workers', 4)) as uploader:
+        tuned = run_model_families(
+            model_names,
+            __tune,
+            publish=__publish,
+            cpu_budget=kwargs.get('cpu_budget'),
+            accepts_n_jobs=lambda name: supports_n_jobs(load_class(name)),
+        )
+    results = [(best_params, name, best_rmse) for best_params, name, best_rmse, _ in tuned]
 
     return results, X, y, {'dv': dv}
\ No newline at end of file
@@ -5,8 +5,12 @@ from pandas import Series
 from scipy.sparse._csr import csr_matrix
 from sklearn.base import BaseEstimator
 
-from mlops.utils.models.sklearn import load_class, tune_hyperparameters
-from mlops.utils.logging import track_experiment  # <-- Added tracking
+from mlops.utils.fingerprint import dataset_fingerprint
+from mlops.utils.hyperparameters.trial_cache import TrialCache
+from mlops.utils.hyperparameters.warm_start import DATASET_FINGERPRINT_TAG, log_trials
+from mlops.utils.models.cross_validation import rolling_origin_folds
+from mlops.utils.models.sklearn import encoder_params, load_class, tune_hyperparameters
+from mlops.utils.logging import setup_experiment, track_experiment  # <-- Added tracking
 
 if 'transformer' not in globals():
     from mage_ai.data_preparation.decorators import transformer
@@ -29,6 +33,8 @@ def hyperparameter_tuning(
         raise ValueError("training_set['build'] must be a list of at least 7 elements")
 
     X, X_train, X_val, y, y_train, y_val, dv = build[:7]
+    # Vectorizer that encoded the full X (older builds encoded it with dv)
+    dv_full = build[8] if len(build) > 8 else dv
 
     # Clean labels
     y_train = pd.to_numeric(y_train, errors="coerce")
@@ -40,42 +46,91 @@ def hyperparameter_tuning(
 
     # Load model from input
     model_class = load_class(model_class_name)
+    model_params = encoder_params(model_class, dv)
+
+    # Skip tuning when the fingerprint gate found a model trained on identical inputs
+    gate = args[0] if args and isinstance(args[0], dict) else {}
+    if gate.get('unchanged'):
+        print(f"⏭️ {model_class_name}: inputs unchanged, reusing {gate['model_uri']}")
+        return {}, X, y, {
+            'cls': model_class,
+            'name': model_class_name,
+            'rmse': float('inf'),
+            'dv': dv_full,
+            'gate': gate,
+        }
+
+    # Optionally score trials with rolling-origin cross-validation over the full dataset
+    # instead of the single train/val split
+    tuning_data = dict(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val)
+    tuning_dv = dv
+    cv_folds = None
+    n_folds = kwargs.get('cv_folds')
+    if n_folds and len(build) > 7:
+        y_full = pd.to_numeric(y, errors="coerce")
+        mask = y_full.notna().to_numpy()
+        tuning_data = dict(X_train=X[mask], y_train=y_full[mask], X_val=None, y_val=None)
+        cv_folds = rolling_origin_folds(build[7][mask], n_folds=int(n_folds))
+        tuning_dv = dv_full
+        model_params = encoder_params(model_class, tuning_dv)
+
+    # Identifies the tuning data and folds so later runs can warm-start from this one
+    fingerprint = dataset_fingerprint(
+        *tuning_data.values(), *(idx for fold in cv_folds or [] for idx in fold),
+    )
+    trials = []
 
     # Tune the model
-    best_params, best_rmse = tune_hyperparameters(
+    best_params, best_rmse, model = tune_hyperparameters(
         model_class,
-        X_train=X_train,
-        y_train=y_train,
-        X_val=X_val,
-        y_val=y_val,
+        **tuning_data,
+        cv_folds=cv_folds,
+        cv_workers=kwargs.get('cv_workers'),
+        trials_log=trials,
         max_evaluations=kwargs.get('max_evaluations', 50),
         random_state=kwargs.get('random_state', 42),
+        warm_start=kwargs.get('warm_start', False),
+        dataset_fingerprint=fingerprint,
+        model_params=model_params,
+        return_best_model=True,
+        grow_forests=kwargs.get('grow_forests', False),
+        trial_cache=TrialCache(kwargs.get('trial_cache_dir')) if kwargs.get('cache_trials', False) else None,
     )
 
     print(f"✅ {model_class_name} best RMSE: {best_rmse:.4f}")
 
-    # Instantiate and fit the model before logging
-    model = model_class(**best_params)
-    model.fit(X_train, y_train)
+    # Reuse the model fitted in the best trial; refit when none was captured
+    # (warm-start history, trial cache hits without a stored model or cross-validation)
+    if model is None:
+        model = model_class(**best_params, **model_params)
+        model.fit(tuning_data['X_train'], tuning_data['y_train'])
 
     # Log the tuning experiment
-    track_experiment(
+    run = track_experiment(
         model=model,  # ← use the fitted model here
-        dict_vectorizer=dv,
+        dict_vectorizer=tuning_dv,
         hyperparameters=best_params,
         metrics={'rmse': best_rmse},
-        training_set=X_train,
-        training_targets=y_train,
+        training_set=tuning_data['X_train'],
+        training_targets=tuning_data['y_train'],
         validation_set=X_val,
         validation_targets=y_val,
         pipeline_uuid=kwargs.get('pipeline_uuid'),
         block_uuid=kwargs.get('block_uuid'),
         run_name=f"tuning_{model_class_name}",
+        tags={DATASET_FINGERPRINT_TAG: fingerprint},
     )
+    # Every evaluated trial, replayed by later warm-started runs
+    client, _ = setup_experiment()
+    log_trials(client, run.info.run_id, trials)
 
+    # The final model is fitted on the full X, encoded by dv_full
     return best_params, X, y, {
     'cls': model_class,
     'name': model_class_name,
     'rmse': best_rmse,
-    'dv': dv,
+    'dv': dv_full,
+    'gate': gate,
+    'model': model,
+    'model_params': encoder_params(model_class, dv_full),
 }
\ No newline at end of file
@@ -5,7 +5,7 @@ from pandas import Series
 from scipy.sparse._csr import csr_matrix
 from sklearn.base import BaseEstimator
 
-from mlops.utils.models.sklearn import load_class, tune_hyperparameters
+from mlops.utils.models.sklearn import encoder_params, load_class, tune_hyperparameters
 
 if 'transformer' not in globals():
     from mage_ai.data_preparation.decorators import transformer
@@ -27,7 +27,9 @@ def hyperparameter_tuning(
     if not isinstance(build, list) or len(build) < 7:
         raise ValueError("training_set['build'] must be a list of at least 7 elements")
 
-    X, X_train, X_val, y, y_train, y_val, _ = build[:7]
+    X, X_train, X_val, y, y_train, y_val, dv = build[:7]
+    # Vectorizer that encoded the full X (older builds encoded it with dv)
+    dv_full = build[8] if len(build) > 8 else dv
 
     # Clean labels
     y_train = pd.to_numeric(y_train, errors="coerce")
@@ -39,18 +41,30 @@ def hyperparameter_tuning(
 
     # Load model from input (not looped)
     model_class = load_class(model_class_name)
+    model_params = encoder_params(model_class, dv)
 
     # Tune the model
-    best_params, best_rmse = tune_hyperparameters(
+    best_params, best_rmse, model = tune_hyperparameters(
         model_class,
         X_train=X_train,
         y_train=y_train,
         X_val=X_val,
         y_val=y_val,
+        model_params=model_params,
         max_evaluations=kwargs.get('max_evaluations', 50),
         random_state=kwargs.get('random_state', 42),
+        return_best_model=True,
     )
 
     print(f"✅ {model_class_name} best RMSE: {best_rmse:.4f}")
 
-    return best_params, X, y, {'cls': model_class, 'name': model_class_name}
\ No newline at end of file
+    # The fitted model lets select_best_model benchmark serving latency and size; a
+    # model refitted on the full X is encoded by dv_full
+    return best_params, X, y, {
+        'cls': model_class,
+        'name': model_class_name,
+        'rmse': best_rmse,
+        'dv': dv_full,
+        'model': model,
+        'model_params': encoder_params(model_class, dv_full),
+    }
\ No newline at end of file
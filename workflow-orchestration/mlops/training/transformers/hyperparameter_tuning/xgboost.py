@@ -0,0 +1,94 @@
+from typing import Dict, Tuple, Union
+
+import pandas as pd
+from pandas import Series
+from scipy.sparse._csr import csr_matrix
+from xgboost import Booster
+
+from mlops.utils.logging import log_run_data, setup_experiment, track_experiment
+from mlops.utils.models.xgboost import fit_model, prepare_data, tune_hyperparameters
+
+if 'transformer' not in globals():
+    from mage_ai.data_preparation.decorators import transformer
+
+@transformer
+def hyperparameter_tuning(
+    training_set: Dict[str, list],
+    *args,
+    **kwargs,
+) -> Tuple[
+    Dict[str, Union[bool, float, int, str]],
+    csr_matrix,
+    Series,
+    Dict[str, Union[Booster, str]],
+]:
+    # Unpack training data
+    build = training_set.get("build")
+    if not isinstance(build, list) or len(build) < 7:
+        raise ValueError("training_set['build'] must be a list of at least 7 elements")
+
+    X, X_train, X_val, y, y_train, y_val, dv = build[:7]
+
+    # Clean labels
+    y_train = pd.to_numeric(y_train, errors="coerce")
+    y_val = pd.to_numeric(y_val, errors="coerce")
+    X_train = X_train[y_train.notna()]
+    y_train = y_train[y_train.notna()]
+    X_val = X_val[y_val.notna()]
+    y_val = y_val[y_val.notna()]
+
+    # Histogram cuts are computed once here and shared by every trial and the final fit
+    training, validation = prepare_data(X_train, y_train, X_val, y_val)
+
+    tracking = dict(
+        block_uuid=kwargs.get('block_uuid'),
+        partition=kwargs.get('execution_partition'),
+        pipeline_uuid=kwargs.get('pipeline_uuid'),
+    )
+    # Trials are logged as child runs of one tuning run that summarizes them
+    parent = track_experiment(run_name='tuning_Booster', tags=dict(model='Booster'), **tracking)
+    trials = dict(count=0, pruned=0)
+
+    def __track_trial(tags: Dict[str, str] = {}, **opts) -> None:
+        trials['count'] += 1
+        trials['pruned'] += tags.get('pruned') == 'true'
+        track_experiment(
+            run_name=f"tuning_Booster_trial_{trials['count']}",
+            tags={**tags, 'mlflow.parentRunId': parent.info.run_id},
+            **opts,
+            **tracking,
+        )
+
+    best_params = tune_hyperparameters(
+        training,
+        validation,
+        callback=__track_trial,
+        early_stopping_rounds=kwargs.get('early_stopping_rounds', 50),
+        max_evaluations=kwargs.get('max_evaluations', 50),
+        random_state=kwargs.get('random_state', 42),
+        verbose_eval=kwargs.get('verbose_eval', False),
+        prune=kwargs.get('prune', False),
+    )
+
+    client, _ = setup_experiment()
+    log_run_data(
+        client,
+        parent.info.run_id,
+        params={},
+        metrics={'trials': trials['count'], 'pruned_trials': trials['pruned']},
+        tags={},
+    )
+
+    model = fit_model(
+        training,
+        dict(best_params, tree_method='hist'),
+        verbose_eval=False,
+        validation_set=validation,
+    )
+
+    return best_params, X, y, {
+        'cls': Booster,
+        'name': 'Booster',
+        'dv': dv,
+        'model': model,
+    }
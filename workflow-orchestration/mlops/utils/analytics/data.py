@@ -1,4 +1,4 @@
-from datetime import datetime
+from typing import Dict
 
 import pandas as pd
 import sqlite3
@@ -6,64 +6,83 @@ import sqlite3
 from mlops.utils.logging import DEFAULT_TRACKING_URI
 
 
+# One row per run: metrics are pivoted and start times bucketed by SQLite, so pandas
+# only converts columns. :since and :offset restrict an incremental load to new runs
+# and continue the run_id numbering of the runs already loaded.
 QUERY = """
+WITH model_runs AS (
+    SELECT
+        runs.run_uuid
+        , runs.start_time
+        , tags.value AS model
+    FROM runs
+
+    INNER JOIN tags ON runs.run_uuid = tags.run_uuid AND tags.key = 'model'
+
+    WHERE tags.value IS NOT NULL
+        AND tags.value != 'NoneType'
+        AND runs.start_time >= :since
+)
+
 SELECT
-    runs.run_uuid
-    , ROW_NUMBER() OVER (ORDER BY runs.start_time) AS run_id
-    , tags.value AS model
-    , runs.start_time AS start_time
-    , CASE WHEN metrics.key = 'mse' THEN metrics.value ELSE NULL END AS mse
-    , CASE WHEN metrics.key = 'rmse' THEN metrics.value ELSE NULL END AS rmse
-FROM runs
-
-INNER JOIN tags ON runs.run_uuid = tags.run_uuid
-INNER JOIN metrics ON runs.run_uuid = metrics.run_uuid
-
-WHERE tags.key = 'model'
-    AND tags.value IS NOT NULL
-    AND tags.value != 'NoneType'
-    AND metrics.value IS NOT NULL
-
-ORDER BY runs.start_time ASC
+    model_runs.run_uuid
+    , ROW_NUMBER() OVER (ORDER BY model_runs.start_time) + :offset AS run_id
+    , model_runs.model
+    , model_runs.start_time
+    , CAST(strftime('%d', model_runs.start_time / 1000, 'unixepoch') AS INTEGER) AS start_time_day
+    , CAST(strftime('%H', model_runs.start_time / 1000, 'unixepoch') AS INTEGER) AS start_time_hour
+    , CAST(strftime('%M', model_runs.start_time / 1000, 'unixepoch') AS INTEGER) AS start_time_minute
+    , strftime('%Y-%m-%d', model_runs.start_time / 1000, 'unixepoch') AS start_time_format_day
+    , strftime('%Y-%m-%d %H:%M', model_runs.start_time / 1000, 'unixepoch') AS start_time_format_hour
+    , strftime('%H:%MD%d', model_runs.start_time / 1000, 'unixepoch') AS start_time_format_minute
+    , MAX(CASE WHEN latest_metrics.key = 'mse' THEN latest_metrics.value END) AS mse
+    , MAX(CASE WHEN latest_metrics.key = 'rmse' THEN latest_metrics.value END) AS rmse
+FROM model_runs
+
+INNER JOIN latest_metrics ON model_runs.run_uuid = latest_metrics.run_uuid
+
+WHERE latest_metrics.value IS NOT NULL
+
+GROUP BY model_runs.run_uuid
+
+ORDER BY model_runs.start_time ASC
 """
 
+# Frames already loaded, per tracking database, for incremental loads
+_loaded: Dict[str, pd.DataFrame] = {}
+
 
 def load_data(*args, **kwargs) -> pd.DataFrame:
-    with sqlite3.connect(DEFAULT_TRACKING_URI.split('/')[-1]) as conn:
-        cursor = conn.cursor()
-
-        cursor.execute(QUERY)
-
-        rows = cursor.fetchall()
-        processed_rows = []
-        for row in rows:
-            run_uuid, run_id, model, start_time, mse, rmse = row
-            start_time = datetime.utcfromtimestamp(start_time / 1000)
-            start_time_day = start_time.day
-            start_time_hour = start_time.hour
-            start_time_minute = start_time.minute
-            start_time_format_day = start_time.strftime('%Y-%m-%d')
-            start_time_format_hour = start_time.strftime('%Y-%m-%d %H:%M')
-            start_time_format_minute = start_time.strftime('%H:%MD%d')
-
-
-            data = dict(
-                model=model,
-                mse=mse,
-                rmse=rmse,
-                run_id=run_id,
-                run_uuid=run_uuid,
-                start_time=start_time,
-                start_time_day=start_time_day,
-                start_time_format_day=start_time_format_day,
-                start_time_format_hour=start_time_format_hour,
-                start_time_format_minute=start_time_format_minute,
-                start_time_hour=start_time_hour,
-                start_time_minute=start_time_minute,
-            )
-            data[f'mse_{model}'] = mse
-            data[f'rmse_{model}'] = rmse
-
-            processed_rows.append(data)
-
-        return pd.DataFrame(processed_rows)
+    """
+    Runs of the tracking database with their mse/rmse, one row per run.
+
+    With incremental=True, only runs started since the last load of this process are
+    read and appended to it. Metrics logged to an already loaded run after that load
+    are not picked up; a full load refreshes them.
+    """
+    database = DEFAULT_TRACKING_URI.split('/')[-1]
+    previous = _loaded.get(database) if kwargs.get('incremental') else None
+
+    since, offset = 0, 0
+    if previous is not None and len(previous):
+        since = int(previous['start_time'].max().value // 10 ** 6)
+        # Runs sharing the last start time are read again, then deduplicated
+        offset = int((previous['start_time'] < previous['start_time'].max()).sum())
+
+    with sqlite3.connect(database) as conn:
+        df = pd.read_sql_query(QUERY, conn, params=dict(since=since, offset=offset))
+
+    df['start_time'] = pd.to_datetime(df['start_time'], unit='ms')
+
+    for model in df['model'].unique():
+        is_model = df['model'] == model
+        df[f'mse_{model}'] = df['mse'].where(is_model)
+        df[f'rmse_{model}'] = df['rmse'].where(is_model)
+
+    if previous is not None and len(previous):
+        previous = previous[previous['start_time'] < previous['start_time'].max()]
+        df = pd.concat([previous, df], ignore_index=True)
+
+    _loaded[database] = df
+
+    return df
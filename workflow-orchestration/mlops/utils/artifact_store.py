@@ -0,0 +1,177 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Optional
+from urllib.parse import urlparse
+
+import boto3
+import mlflow
+from botocore.exceptions import ClientError
+from mlflow import MlflowClient
+from mlflow.store.artifact.artifact_repo import ArtifactRepository
+from mlflow.store.artifact.artifact_repository_registry import get_artifact_repository
+from mlflow.utils.file_utils import local_file_uri_to_path
+
+# Run tags pointing at a content-addressed artifact, e.g. artifact.dict_vectorizer.sha256
+DIGEST_TAG = 'artifact.{name}.sha256'
+URI_TAG = 'artifact.{name}.uri'
+
+DEFAULT_CACHE_DIR = os.getenv('ARTIFACT_CACHE_DIR', os.path.expanduser('~/.cache/mlops/artifacts'))
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def content_root(client: MlflowClient, experiment_id: str) -> str:
+    """
+    Content store of an experiment: a cas/ folder next to its runs, so it lives in the
+    same bucket or directory and uses the same credentials. MLFLOW_CAS_ROOT overrides it.
+    """
+    root = os.getenv('MLFLOW_CAS_ROOT') or f"{client.get_experiment(experiment_id).artifact_location.rstrip('/')}/cas"
+
+    return f'{root}/sha256'
+
+
+def s3_object_exists(s3_client, bucket: str, key: str) -> bool:
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as error:
+        if error.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+    return True
+
+
+def content_exists(repository: ArtifactRepository, root: str, digest: str) -> bool:
+    """
+    Whether the content store under root already holds digest, with a single lookup of
+    its key on S3 and local stores rather than a listing.
+    """
+    parsed = urlparse(root)
+
+    if parsed.scheme == 's3':
+        s3_client = boto3.client('s3', endpoint_url=os.getenv('MLFLOW_S3_ENDPOINT_URL'))
+        key = '/'.join(filter(None, [parsed.path.strip('/'), digest[:2], digest]))
+        return s3_object_exists(s3_client, parsed.netloc, key)
+
+    if parsed.scheme in ('', 'file'):
+        return os.path.exists(os.path.join(local_file_uri_to_path(root), digest[:2], digest))
+
+    return any(os.path.basename(f.path) == digest for f in repository.list_artifacts(digest[:2]))
+
+
+def put_file(path: str, root: str) -> str:
+    """
+    Store a file under <root>/<digest[:2]>/<digest> unless already there, through MLflow's
+    artifact repositories (local, S3, ...). Returns the URI of the stored content.
+    """
+    digest = file_digest(path)
+    repository = get_artifact_repository(root)
+
+    if not content_exists(repository, root, digest):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            named = os.path.join(tmp_dir, digest)
+            shutil.copyfile(path, named)
+            repository.log_artifact(named, artifact_path=digest[:2])
+
+    return f'{root}/{digest[:2]}/{digest}'
+
+
+def stage_content(obj: object, staging_dir: str) -> str:
+    """
+    Pickle obj into staging_dir laid out like the content store, <digest[:2]>/<digest>,
+    so the directory can be uploaded as is under content_root. Returns the digest.
+    """
+    path = os.path.join(staging_dir, 'object.bin')
+    with open(path, 'wb') as file:
+        pickle.dump(obj, file)
+
+    digest = file_digest(path)
+    os.makedirs(os.path.join(staging_dir, digest[:2]), exist_ok=True)
+    os.replace(path, os.path.join(staging_dir, digest[:2], digest))
+
+    return digest
+
+
+def tag_content(client: MlflowClient, run_id: str, name: str, uri: str) -> None:
+    client.set_tag(run_id, DIGEST_TAG.format(name=name), uri.rsplit('/', 1)[-1])
+    client.set_tag(run_id, URI_TAG.format(name=name), uri)
+
+
+def log_content_addressed(
+    client: MlflowClient,
+    run_id: str,
+    obj: object,
+    name: str,
+) -> str:
+    """
+    Pickle obj into the content store and reference it from the run with the
+    artifact.<name>.sha256 / artifact.<name>.uri tags. Identical objects logged by
+    different runs are stored once. Returns the digest.
+    """
+    run = client.get_run(run_id)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f'{name}.bin')
+        with open(path, 'wb') as file:
+            pickle.dump(obj, file)
+
+        uri = put_file(path, content_root(client, run.info.experiment_id))
+
+    tag_content(client, run_id, name, uri)
+
+    return uri.rsplit('/', 1)[-1]
+
+
+def fetch_content(uri: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """
+    Local path of a content-addressed artifact. Downloads happen once per digest, so the
+    cache hits across runs and model versions sharing the artifact.
+    """
+    digest = uri.rsplit('/', 1)[-1]
+    cached = os.path.join(cache_dir, digest)
+
+    if not os.path.exists(cached):
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=cache_dir) as tmp_dir:
+            downloaded = mlflow.artifacts.download_artifacts(artifact_uri=uri, dst_path=tmp_dir)
+            if file_digest(downloaded) != digest:
+                raise ValueError(f'Corrupted download of {uri}')
+            os.replace(downloaded, cached)
+
+    return cached
+
+
+def run_object_path(
+    run_id: str,
+    name: str = 'dict_vectorizer',
+    legacy_path: Optional[str] = 'preprocessing/dict_vectorizer.bin',
+    client: Optional[MlflowClient] = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> str:
+    """
+    Local path of the <name> artifact of a run, from the content store, falling back to
+    the run's own legacy_path artifact for runs logged before content addressing.
+    """
+    client = client or MlflowClient()
+    uri = client.get_run(run_id).data.tags.get(URI_TAG.format(name=name))
+
+    if uri:
+        return fetch_content(uri, cache_dir)
+
+    # Through the client, which may point at another tracking server than mlflow's default
+    return client.download_artifacts(run_id, legacy_path)
+
+
+def load_run_object(run_id: str, name: str = 'dict_vectorizer', **kwargs) -> object:
+    with open(run_object_path(run_id, name, **kwargs), 'rb') as file:
+        return pickle.load(file)
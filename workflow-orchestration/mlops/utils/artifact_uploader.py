@@ -0,0 +1,118 @@
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+
+from mlops.utils.artifact_store import s3_object_exists
+
+# Files above the threshold are uploaded in parallel parts of multipart_chunksize.
+DEFAULT_MULTIPART_THRESHOLD = 64 * 1024 ** 2
+DEFAULT_MULTIPART_CHUNKSIZE = 16 * 1024 ** 2
+
+
+class ArtifactUploader:
+    """
+    Uploads run artifact directories to S3 on a bounded thread pool, so training does
+    not wait on S3. Each upload runs its on_complete callback (e.g. registering the model
+    and marking the run FINISHED) only once every file was confirmed, or on_error.
+
+    The S3 endpoint can be pointed at a local stand-in (MinIO, moto server) with
+    MLFLOW_S3_ENDPOINT_URL, like MLflow itself.
+
+    Use as a context manager: leaving it waits for every pending upload.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD,
+        multipart_chunksize: int = DEFAULT_MULTIPART_CHUNKSIZE,
+        s3_client=None,
+    ):
+        self.s3_client = s3_client or boto3.client(
+            's3', endpoint_url=os.getenv('MLFLOW_S3_ENDPOINT_URL')
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+        )
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='artifact-upload')
+        self.futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    def _upload_directory(self, local_dir: str, artifact_uri: str, skip_existing: bool = False) -> int:
+        parsed = urlparse(artifact_uri)
+        bucket, prefix = parsed.netloc, parsed.path.lstrip('/')
+
+        uploaded = 0
+        for root, _, files in os.walk(local_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                key = '/'.join(filter(None, [prefix, os.path.relpath(path, local_dir).replace(os.sep, '/')]))
+                if skip_existing and s3_object_exists(self.s3_client, bucket, key):
+                    continue
+                # upload_file only returns once all parts are acknowledged
+                self.s3_client.upload_file(path, bucket, key, Config=self.transfer_config)
+                uploaded += 1
+
+        return uploaded
+
+    def upload(
+        self,
+        local_dir: str,
+        artifact_uri: str,
+        on_complete: Optional[Callable[[], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        cleanup: bool = True,
+        skip_existing: bool = False,
+    ) -> Future:
+        """
+        Queue the upload of local_dir under artifact_uri (s3://bucket/prefix). With
+        cleanup, local_dir is removed once done, successful or not. skip_existing leaves
+        keys already in the bucket alone, for content-addressed keys.
+        """
+        def __run() -> int:
+            try:
+                uploaded = self._upload_directory(local_dir, artifact_uri, skip_existing)
+                if on_complete:
+                    on_complete()
+                return uploaded
+            except BaseException as error:
+                if on_error:
+                    on_error(error)
+                raise
+            finally:
+                if cleanup:
+                    shutil.rmtree(local_dir, ignore_errors=True)
+
+        future = self.executor.submit(__run)
+        with self._lock:
+            self.futures.append(future)
+
+        return future
+
+    def wait(self) -> None:
+        """
+        Block until every queued upload is done, re-raising the first failure.
+        """
+        with self._lock:
+            futures, self.futures = self.futures, []
+
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def __enter__(self) -> 'ArtifactUploader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown(wait=True)
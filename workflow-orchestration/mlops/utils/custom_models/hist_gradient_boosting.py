@@ -0,0 +1,102 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from mlops.utils.data_preparation.feature_selector import NUMERICAL_FEATURES
+
+CATEGORICAL_FEATURE = 'PU_DO'
+
+
+class CategoricalHistGradientBoostingRegressor(BaseEstimator, RegressorMixin):
+    """
+    HistGradientBoostingRegressor taking PU_DO as a native categorical instead of its
+    one-hot expansion. Accepts the DictVectorizer output used by every other model and
+    folds it into a dense matrix: one PU_DO code column followed by the numericals.
+
+    feature_names: the DictVectorizer's feature_names_, to locate the columns.
+    The max_bins most frequent PU_DO values get a code, the others are treated as missing.
+    """
+
+    def __init__(
+        self,
+        feature_names: Optional[Sequence[str]] = None,
+        learning_rate: float = 0.1,
+        max_iter: int = 100,
+        max_leaf_nodes: int = 31,
+        min_samples_leaf: int = 20,
+        l2_regularization: float = 0.0,
+        max_bins: int = 255,
+        random_state: Optional[int] = None,
+    ):
+        self.feature_names = feature_names
+        self.learning_rate = learning_rate
+        self.max_iter = max_iter
+        self.max_leaf_nodes = max_leaf_nodes
+        self.min_samples_leaf = min_samples_leaf
+        self.l2_regularization = l2_regularization
+        self.max_bins = max_bins
+        self.random_state = random_state
+
+    def _locate_columns(self) -> None:
+        names = list(self.feature_names)
+        prefix = f'{CATEGORICAL_FEATURE}='
+
+        self.category_columns_ = np.array([i for i, name in enumerate(names) if name.startswith(prefix)])
+        self.category_names_: List[str] = [names[i][len(prefix):] for i in self.category_columns_]
+        self.numerical_columns_ = np.array([names.index(name) for name in NUMERICAL_FEATURES])
+
+    def _to_dense(self, X: scipy.sparse.csr_matrix) -> np.ndarray:
+        X = scipy.sparse.csr_matrix(X)
+
+        # Each row has at most one PU_DO=... column set
+        categories = X[:, self.category_columns_].tocsr()
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(categories.indptr))
+        codes = np.full(X.shape[0], np.nan)
+        codes[rows] = self.category_codes_[categories.indices]
+
+        return np.column_stack([codes, X[:, self.numerical_columns_].toarray()])
+
+    def fit(self, X: scipy.sparse.csr_matrix, y) -> 'CategoricalHistGradientBoostingRegressor':
+        if self.feature_names is None:
+            raise ValueError('feature_names is required to decode the DictVectorizer columns')
+
+        self._locate_columns()
+
+        # Codes ordered by frequency; the long tail beyond max_bins becomes missing (NaN)
+        counts = np.asarray(X[:, self.category_columns_].sum(axis=0)).ravel()
+        self.category_codes_ = np.full(len(self.category_columns_), np.nan)
+        top = np.argsort(-counts, kind='stable')[:self.max_bins]
+        self.category_codes_[top] = np.arange(len(top))
+
+        self.model_ = HistGradientBoostingRegressor(
+            learning_rate=self.learning_rate,
+            max_iter=self.max_iter,
+            max_leaf_nodes=self.max_leaf_nodes,
+            min_samples_leaf=self.min_samples_leaf,
+            l2_regularization=self.l2_regularization,
+            max_bins=self.max_bins,
+            categorical_features=[0],
+            random_state=self.random_state,
+        )
+        self.model_.fit(self._to_dense(X), np.asarray(y))
+
+        return self
+
+    def predict(self, X: scipy.sparse.csr_matrix) -> np.ndarray:
+        return self.model_.predict(self._to_dense(X))
+
+    def predict_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Serving adapter: predict straight from the selected features DataFrame
+        (PU_DO and the numericals), without the DictVectorizer.
+        """
+        lookup = dict(zip(self.category_names_, self.category_codes_))
+        codes = df[CATEGORICAL_FEATURE].astype(str).map(lookup).astype(np.float64).to_numpy()
+
+        return self.model_.predict(
+            np.column_stack([codes, df[NUMERICAL_FEATURES].astype(np.float64).to_numpy()])
+        )
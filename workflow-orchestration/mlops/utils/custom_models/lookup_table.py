@@ -0,0 +1,161 @@
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from sklearn.base import BaseEstimator, RegressorMixin
+
+CATEGORICAL_FEATURE = 'PU_DO'
+
+# Fallback level of every cell, from most to least specific
+LEVEL_CELL, LEVEL_PUDO_HOUR, LEVEL_PUDO, LEVEL_GLOBAL = range(4)
+
+
+class LookupTableRegressor(BaseEstimator, RegressorMixin):
+    """
+    Duration = trip_miles x median minutes-per-mile of the trip's PU_DO x hour x weekday
+    cell. Cells with fewer than min_count trips fall back to PU_DO x hour, then PU_DO,
+    then the global median. The fitted model is a handful of dense arrays indexed by
+    (PU_DO code, hour, weekday), so a prediction is O(1) whatever the training size.
+
+    feature_names: the DictVectorizer's feature_names_, to decode its output.
+    Cells whose robust relative spread exceeds max_relative_spread, or that fell back,
+    are flagged uncertain and can be routed to another model with predict_routed.
+    """
+
+    def __init__(
+        self,
+        feature_names: Optional[Sequence[str]] = None,
+        min_count: int = 20,
+        max_relative_spread: float = 0.5,
+    ):
+        self.feature_names = feature_names
+        self.min_count = min_count
+        self.max_relative_spread = max_relative_spread
+
+    def _decode(self, X: scipy.sparse.csr_matrix) -> Tuple[np.ndarray, ...]:
+        X = scipy.sparse.csr_matrix(X)
+        names = list(self.feature_names)
+
+        # Rows without a known PU_DO get the extra "unknown" code
+        categories = X[:, self.category_columns_].tocsr()
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(categories.indptr))
+        codes = np.full(X.shape[0], len(self.category_columns_), dtype=np.int64)
+        codes[rows] = categories.indices
+
+        hour, day_of_week, trip_miles = (
+            X[:, names.index(name)].toarray().ravel()
+            for name in ('hour', 'day_of_week', 'trip_miles')
+        )
+
+        return codes, hour.astype(np.int64), day_of_week.astype(np.int64), trip_miles
+
+    def fit(self, X: scipy.sparse.csr_matrix, y) -> 'LookupTableRegressor':
+        if self.feature_names is None:
+            raise ValueError('feature_names is required to decode the DictVectorizer columns')
+
+        prefix = f'{CATEGORICAL_FEATURE}='
+        self.category_columns_ = np.array([i for i, name in enumerate(self.feature_names) if name.startswith(prefix)])
+        self.category_names_ = [self.feature_names[i][len(prefix):] for i in self.category_columns_]
+
+        codes, hour, day_of_week, trip_miles = self._decode(X)
+        df = pd.DataFrame(dict(
+            code=codes,
+            hour=hour,
+            day_of_week=day_of_week,
+            rate=np.asarray(y, dtype=np.float64) / trip_miles,
+        ))
+        df = df[np.isfinite(df['rate'])]
+
+        n_codes = len(self.category_columns_) + 1
+        shape = (n_codes, 24, 7)
+
+        def robust_stats(keys):
+            grouped = df.groupby(keys)['rate']
+            stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+            stats['count'] = grouped.size()
+            return stats[stats['count'] >= self.min_count]
+
+        # Start from the global median and overwrite with ever more specific levels
+        rate = np.full(shape, df['rate'].median(), dtype=np.float64)
+        spread = np.full(shape, (df['rate'].quantile(0.75) - df['rate'].quantile(0.25)) / df['rate'].median())
+        level = np.full(shape, LEVEL_GLOBAL, dtype=np.int8)
+
+        for keys, level_value in [
+            (['code'], LEVEL_PUDO),
+            (['code', 'hour'], LEVEL_PUDO_HOUR),
+            (['code', 'hour', 'day_of_week'], LEVEL_CELL),
+        ]:
+            stats = robust_stats(keys)
+            index = tuple(stats.index.get_level_values(key).to_numpy() for key in keys)
+            # Broadcast over the axes this level does not split on
+            trailing = (-1,) + (1,) * (3 - len(keys))
+
+            rate[index] = stats[0.5].to_numpy().reshape(trailing)
+            spread[index] = ((stats[0.75] - stats[0.25]) / stats[0.5]).to_numpy().reshape(trailing)
+            level[index] = level_value
+
+        self.rate_ = rate.astype(np.float32)
+        self.spread_ = spread.astype(np.float32)
+        self.level_ = level
+        self.uncertain_ = (level != LEVEL_CELL) | (self.spread_ > self.max_relative_spread)
+
+        return self
+
+    def _cells(self, codes, hour, day_of_week) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return np.clip(codes, 0, self.rate_.shape[0] - 1), np.clip(hour, 0, 23), np.clip(day_of_week, 0, 6)
+
+    def predict(self, X: scipy.sparse.csr_matrix) -> np.ndarray:
+        codes, hour, day_of_week, trip_miles = self._decode(X)
+
+        return self.rate_[self._cells(codes, hour, day_of_week)] * trip_miles
+
+    def _frame_cells(self, df: pd.DataFrame) -> Tuple[Tuple[np.ndarray, ...], np.ndarray]:
+        lookup = {name: code for code, name in enumerate(self.category_names_)}
+        codes = df[CATEGORICAL_FEATURE].astype(str).map(lookup).fillna(len(lookup)).astype(np.int64).to_numpy()
+        cells = self._cells(codes, df['hour'].astype(np.int64).to_numpy(), df['day_of_week'].astype(np.int64).to_numpy())
+
+        return cells, df['trip_miles'].astype(np.float64).to_numpy()
+
+    def predict_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Serving adapter: predict straight from the selected features DataFrame,
+        without the DictVectorizer.
+        """
+        cells, trip_miles = self._frame_cells(df)
+
+        return self.rate_[cells] * trip_miles
+
+    def predict_frame_routed(
+        self,
+        df: pd.DataFrame,
+        fallback: Callable[[pd.DataFrame], np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Serving adapter of predict_routed: fallback(rows) predicts the uncertain rows of
+        df (e.g. vectorizes them for a forest). Returns the predictions and the mask of
+        the rows that were routed.
+        """
+        cells, trip_miles = self._frame_cells(df)
+        predictions = self.rate_[cells] * trip_miles
+        uncertain = self.uncertain_[cells]
+        if uncertain.any():
+            predictions[uncertain] = fallback(df[uncertain])
+
+        return predictions, uncertain
+
+    def is_uncertain(self, X: scipy.sparse.csr_matrix) -> np.ndarray:
+        codes, hour, day_of_week, _ = self._decode(X)
+
+        return self.uncertain_[self._cells(codes, hour, day_of_week)]
+
+    def predict_routed(self, X: scipy.sparse.csr_matrix, fallback_model: BaseEstimator) -> np.ndarray:
+        """
+        Answer certain cells from the table and send only the uncertain rows to fallback_model.
+        """
+        predictions = self.predict(X)
+        uncertain = np.flatnonzero(self.is_uncertain(X))
+        if len(uncertain):
+            predictions[uncertain] = fallback_model.predict(scipy.sparse.csr_matrix(X)[uncertain])
+
+        return predictions
@@ -0,0 +1,43 @@
+import importlib
+import tempfile
+
+import mlflow.pyfunc
+import numpy as np
+from mlflow.models.model import ModelInfo
+from sklearn.base import BaseEstimator
+
+from mlops.utils.custom_models.packaging import project_code_paths
+from mlops.utils.models import compact_forest, mmap_model
+
+MMAP_ARTIFACT_PATH = 'mmap_model'
+
+
+def log_mmap_model(
+    model: BaseEstimator,
+    artifact_path: str = MMAP_ARTIFACT_PATH,
+    compact_forests: bool = True,
+) -> ModelInfo:
+    """
+    Log a fitted model to the active run as a pyfunc model stored with mmap_model: its
+    arrays are page-aligned on disk and memory-mapped read-only when loaded.
+    """
+    requirements = [f'numpy=={np.__version__}']
+    package = model.__class__.__module__.split('.')[0]
+    # Models defined in this project are sklearn estimators built on pandas and scipy
+    packages = ['sklearn', 'pandas', 'scipy'] if package == 'mlops' else [package]
+    for package in packages:
+        if package != 'numpy':
+            module = importlib.import_module(package)
+            distribution = 'scikit-learn' if package == 'sklearn' else package
+            requirements.append(f'{distribution}=={module.__version__}')
+
+    with tempfile.TemporaryDirectory() as tmp_dir, project_code_paths(model) as code_paths:
+        mmap_model.save_model(model, tmp_dir, compact_forests=compact_forests)
+
+        return mlflow.pyfunc.log_model(
+            artifact_path=artifact_path,
+            loader_module='mmap_model',
+            data_path=tmp_dir,
+            code_paths=[mmap_model.__file__, compact_forest.__file__, *(code_paths or [])],
+            pip_requirements=requirements,
+        )
@@ -0,0 +1,65 @@
+import ast
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Set
+
+PROJECT_PACKAGE = 'mlops'
+
+
+def _project_imports(module_name: str) -> Set[str]:
+    """
+    Project modules imported by module_name, followed transitively.
+    """
+    pending, found = [module_name], set()
+
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.add(name)
+
+        with open(sys.modules[name].__file__, 'r') as file:
+            tree = ast.parse(file.read())
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # from package import module, or from module import name
+                names = [node.module, *(f'{node.module}.{alias.name}' for alias in node.names)]
+            elif isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            else:
+                continue
+
+            for imported in names:
+                if imported.split('.')[0] == PROJECT_PACKAGE and imported in sys.modules:
+                    if getattr(sys.modules[imported], '__file__', None):
+                        pending.append(imported)
+
+    return found
+
+
+@contextmanager
+def project_code_paths(model: object) -> Iterator[Optional[List[str]]]:
+    """
+    code_paths for logging a model whose class is defined in this project (mlops.*).
+
+    Its module, and the project modules it imports, are copied into a temporary
+    mlops/ tree, so the pickle finds them under the same module path where the model
+    is loaded without the project (serving apps). None for library models.
+    """
+    module_name = model.__class__.__module__
+    if module_name.split('.')[0] != PROJECT_PACKAGE:
+        yield None
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in _project_imports(module_name):
+            # Namespace packages, no __init__.py needed
+            target = os.path.join(tmp_dir, *name.split('.')) + '.py'
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(sys.modules[name].__file__, target)
+
+        yield [os.path.join(tmp_dir, PROJECT_PACKAGE)]
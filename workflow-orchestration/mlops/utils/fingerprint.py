@@ -0,0 +1,187 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, spmatrix
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class RunningStats:
+    """
+    Count, NaNs, min, max, mean and std of values seen chunk by chunk.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nan_count = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, chunk: np.ndarray) -> None:
+        if chunk.dtype.kind not in 'biuf':
+            return
+
+        values = chunk.astype(np.float64, copy=False)
+        missing = np.isnan(values)
+        nan_count = int(missing.sum())
+        if nan_count:
+            values = values[~missing]
+
+        self.nan_count += nan_count
+        if values.size:
+            self.count += values.size
+            self.total += float(values.sum())
+            self.total_squares += float(np.dot(values, values))
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        if not self.count:
+            return dict(count=0, nan_count=self.nan_count, mean=None, std=None, min=None, max=None)
+
+        mean = self.total / self.count
+        return dict(
+            count=self.count,
+            nan_count=self.nan_count,
+            mean=mean,
+            std=max(self.total_squares / self.count - mean ** 2, 0.0) ** 0.5,
+            min=self.min,
+            max=self.max,
+        )
+
+
+def _update_with_array(
+    digest,
+    array: np.ndarray,
+    stats: Optional[RunningStats] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    if array.dtype == object:
+        # Object buffers hold pointers, hash the values instead.
+        array = pd.util.hash_array(array.ravel())
+    array = np.ascontiguousarray(array)
+    digest.update(str(array.dtype).encode())
+    digest.update(str(array.shape).encode())
+
+    # Chunks are views of the array: hashed and summarized while in cache, never copied
+    # whole. The digest is the same as hashing the array at once.
+    flat = array.reshape(-1)
+    for start in range(0, flat.size, chunk_size):
+        chunk = flat[start:start + chunk_size]
+        digest.update(memoryview(chunk).cast('B'))
+        if stats is not None:
+            stats.update(chunk)
+
+
+def dataset_fingerprint(
+    *datasets: Optional[Union[spmatrix, np.ndarray, pd.DataFrame, pd.Series]],
+) -> str:
+    """
+    Content hash of one or more training inputs (CSR matrices, arrays, frames or series).
+    Identical data always produces the same fingerprint, so it can be used to match
+    tracking runs and cached results against the data they were computed on.
+    """
+    digest = hashlib.sha256()
+
+    for dataset in datasets:
+        if dataset is None:
+            digest.update(b'none')
+            continue
+
+        if isinstance(dataset, spmatrix):
+            csr = dataset.tocsr()
+            digest.update(b'csr')
+            digest.update(str(csr.shape).encode())
+            for array in (csr.data, csr.indices, csr.indptr):
+                _update_with_array(digest, array)
+        elif isinstance(dataset, pd.DataFrame):
+            digest.update(b'frame')
+            digest.update(','.join(map(str, dataset.columns)).encode())
+            _update_with_array(
+                digest, pd.util.hash_pandas_object(dataset, index=False).to_numpy()
+            )
+        elif isinstance(dataset, pd.Series):
+            digest.update(b'series')
+            _update_with_array(digest, dataset.to_numpy())
+        else:
+            digest.update(b'array')
+            _update_with_array(digest, np.asarray(dataset))
+
+    return digest.hexdigest()[:16]
+
+
+def array_fingerprint(
+    dataset: Union[spmatrix, np.ndarray, pd.Series],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """
+    Fingerprint, schema and profile of a CSR matrix or array, computed in one chunked
+    pass over its buffers (data/indices/indptr for CSR) without densifying or copying it.
+    The fingerprint equals dataset_fingerprint of the same input.
+    """
+    digest = hashlib.sha256()
+    stats = RunningStats()
+
+    if isinstance(dataset, spmatrix):
+        # No copy for CSR inputs, which is what the training sets are
+        csr = dataset if isinstance(dataset, csr_matrix) else dataset.tocsr()
+        digest.update(b'csr')
+        digest.update(str(csr.shape).encode())
+        _update_with_array(digest, csr.data, stats, chunk_size)
+        for array in (csr.indices, csr.indptr):
+            _update_with_array(digest, array, chunk_size=chunk_size)
+
+        num_rows, num_cols = csr.shape
+        schema = dict(format='csr', dtype=str(csr.dtype), shape=[num_rows, num_cols])
+        profile = dict(
+            num_rows=num_rows,
+            num_cols=num_cols,
+            nnz=int(csr.nnz),
+            density=csr.nnz / (num_rows * num_cols) if num_rows * num_cols else 0.0,
+            values=stats.to_dict(),
+        )
+    else:
+        is_series = isinstance(dataset, pd.Series)
+        array = dataset.to_numpy() if is_series else np.asarray(dataset)
+        digest.update(b'series' if is_series else b'array')
+        _update_with_array(digest, array, stats, chunk_size)
+
+        schema = dict(format='array', dtype=str(array.dtype), shape=list(array.shape))
+        profile = dict(num_rows=int(array.shape[0]) if array.ndim else 1, values=stats.to_dict())
+
+    return digest.hexdigest()[:16], schema, profile
+
+
+def files_fingerprint(*paths: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Content hash of files and directory trees (raw data, source code, configs), read in
+    chunks so large Parquet files are never loaded into memory at once.
+    """
+    digest = hashlib.sha256()
+
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, dirs, names in os.walk(path)
+                if '__pycache__' not in root
+                for name in names
+                if not name.endswith('.pyc')
+            )
+        else:
+            files = [path]
+
+        for file_path in files:
+            relative = os.path.relpath(file_path, path) if os.path.isdir(path) else os.path.basename(path)
+            digest.update(relative.encode())
+            with open(file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(chunk_size), b''):
+                    digest.update(chunk)
+
+    return digest.hexdigest()[:16]
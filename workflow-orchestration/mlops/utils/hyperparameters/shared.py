@@ -11,11 +11,29 @@ from sklearn.linear_model import Lasso, LinearRegression
 from sklearn.svm import LinearSVR
 from xgboost import Booster
 
+from mlops.utils.custom_models.hist_gradient_boosting import CategoricalHistGradientBoostingRegressor
+
+# (low, high, step) of the n_estimators axis searched for each tree ensemble.
+N_ESTIMATORS_RANGES = {
+    ExtraTreesRegressor: (10, 40, 10),
+    GradientBoostingRegressor: (10, 50, 10),
+    RandomForestRegressor: (10, 60, 10),
+}
+
+
+def n_estimators_checkpoints(model_class: Callable) -> List[int]:
+    """
+    Every n_estimators value the quantized search space can produce, in increasing order.
+    """
+    low, high, step = N_ESTIMATORS_RANGES[model_class]
+    return list(range(low, high + 1, step))
+
 
 def build_hyperparameters_space(
     model_class: Callable[
         ...,
         Union[
+            CategoricalHistGradientBoostingRegressor,
             ExtraTreesRegressor,
             GradientBoostingRegressor,
             Lasso,
@@ -45,7 +63,7 @@ def build_hyperparameters_space(
             max_depth=scope.int(hp.quniform('max_depth', 5, 45, 5)),
             min_samples_leaf=scope.int(hp.quniform('min_samples_leaf', 1, 10, 1)),
             min_samples_split=scope.int(hp.quniform('min_samples_split', 2, 20, 1)),
-            n_estimators=scope.int(hp.quniform('n_estimators', 10, 60, 10)),
+            n_estimators=scope.int(hp.quniform('n_estimators', *N_ESTIMATORS_RANGES[RandomForestRegressor])),
             random_state=random_state,
         )
 
@@ -55,7 +73,7 @@ def build_hyperparameters_space(
             max_depth=scope.int(hp.quniform('max_depth', 5, 40, 1)),
             min_samples_leaf=scope.int(hp.quniform('min_samples_leaf', 1, 10, 1)),
             min_samples_split=scope.int(hp.quniform('min_samples_split', 2, 20, 1)),
-            n_estimators=scope.int(hp.quniform('n_estimators', 10, 50, 10)),
+            n_estimators=scope.int(hp.quniform('n_estimators', *N_ESTIMATORS_RANGES[GradientBoostingRegressor])),
             random_state=random_state,
         )
 
@@ -64,10 +82,19 @@ def build_hyperparameters_space(
             max_depth=scope.int(hp.quniform('max_depth', 5, 30, 5)),
             min_samples_leaf=scope.int(hp.quniform('min_samples_leaf', 1, 10, 1)),
             min_samples_split=scope.int(hp.quniform('min_samples_split', 2, 20, 2)),
-            n_estimators=scope.int(hp.quniform('n_estimators', 10, 40, 10)),
+            n_estimators=scope.int(hp.quniform('n_estimators', *N_ESTIMATORS_RANGES[ExtraTreesRegressor])),
             random_state=random_state,
         )
 
+    if CategoricalHistGradientBoostingRegressor is model_class:
+        params = dict(
+            learning_rate=hp.loguniform('learning_rate', -4, 0),  # Between e^-4 and e^0
+            l2_regularization=hp.loguniform('l2_regularization', -6, 0),
+            max_iter=scope.int(hp.quniform('max_iter', 100, 500, 50)),
+            max_leaf_nodes=scope.int(hp.quniform('max_leaf_nodes', 16, 128, 16)),
+            min_samples_leaf=scope.int(hp.quniform('min_samples_leaf', 10, 100, 10)),
+            random_state=random_state,
+        )
 
     if LinearRegression is model_class:
         choices['fit_intercept'] = [True, False]
@@ -94,6 +121,8 @@ def build_hyperparameters_space(
             reg_lambda=hp.loguniform('reg_lambda', -6, -1),
             # Fraction of samples to be used for each tree.
             subsample=hp.uniform('subsample', 0.1, 1.0),
+            # Histogram method, required to train on a (cached) QuantileDMatrix.
+            tree_method='hist',
         )
 
     for key, value in choices.items():
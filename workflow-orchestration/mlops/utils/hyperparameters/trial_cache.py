@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import platform
+from typing import Callable, Dict, Optional
+
+import joblib
+import numpy as np
+import scipy
+import sklearn
+
+# Under the Mage project root, so it does not depend on the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_TRIAL_CACHE_DIR = os.getenv('TRIAL_CACHE_DIR', os.path.join(PROJECT_ROOT, '.trial_cache'))
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        # hyperopt's quantized values come back as floats (e.g. 30.0 == 30).
+        return int(value)
+
+    return value
+
+
+class TrialCache:
+    """
+    Content-addressed store of trial metrics, persisted as one JSON file per key so that
+    results are shared across tuning runs. The key covers the model class, the
+    canonicalized hyperparameters, the training data fingerprint and the library
+    versions that produced the result. Models of trials that improved on the best loss
+    can be stored next to their metrics, so a cached best trial does not need a refit.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or DEFAULT_TRIAL_CACHE_DIR
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, model_class: Callable, params: Dict, dataset_fingerprint: str) -> str:
+        payload = dict(
+            model=f'{model_class.__module__}.{model_class.__qualname__}',
+            params=_canonical(params),
+            dataset=dataset_fingerprint,
+            versions=dict(
+                numpy=np.__version__,
+                python=platform.python_version(),
+                scipy=scipy.__version__,
+                sklearn=sklearn.__version__,
+            ),
+        )
+
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str, extension: str = 'json') -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.{extension}')
+
+    def get(self, key: str) -> Optional[Dict[str, float]]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        with open(path, 'r') as file:
+            metrics = json.load(file)
+
+        self.hits += 1
+        return metrics
+
+    def put(self, key: str, metrics: Dict[str, float]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename, so concurrent readers never see a partial file.
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({k: float(v) for k, v in metrics.items()}, file)
+        os.replace(tmp_path, path)
+
+    def get_model(self, key: str) -> Optional[object]:
+        path = self._path(key, 'joblib')
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def put_model(self, key: str, model: object) -> None:
+        path = self._path(key, 'joblib')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f'trial cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)'
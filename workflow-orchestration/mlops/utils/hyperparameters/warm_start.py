@@ -0,0 +1,123 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import mlflow
+from hyperopt import STATUS_OK, Trials
+from hyperopt.base import JOB_STATE_DONE
+from hyperopt.pyll import Apply
+from mlflow import MlflowClient
+
+from mlops.utils.logging import DEFAULT_EXPERIMENT_NAME, DEFAULT_TRACKING_URI
+
+DATASET_FINGERPRINT_TAG = 'dataset_fingerprint'
+# Every (params, loss) pair evaluated by a tuning run, logged next to its best params.
+TRIALS_ARTIFACT = 'tuning/trials.json'
+
+
+def log_trials(
+    client: MlflowClient,
+    run_id: str,
+    trials: List[Tuple[Dict[str, Any], float]],
+) -> None:
+    client.log_dict(
+        run_id,
+        [dict(params={k: str(v) for k, v in params.items()}, loss=float(loss)) for params, loss in trials],
+        TRIALS_ARTIFACT,
+    )
+
+
+def _run_trials(client: MlflowClient, run, loss_metric: str) -> List[Tuple[Dict[str, str], float]]:
+    artifacts = [artifact.path for artifact in client.list_artifacts(run.info.run_id, 'tuning')]
+    if TRIALS_ARTIFACT in artifacts:
+        logged = mlflow.artifacts.load_dict(f'{run.info.artifact_uri}/{TRIALS_ARTIFACT}')
+        return [(trial['params'], trial['loss']) for trial in logged]
+
+    # Runs logged before trials were recorded only have their best params
+    loss = run.data.metrics.get(loss_metric)
+    return [(run.data.params, loss)] if loss is not None else []
+
+
+def load_tuning_history(
+    model_class: Callable,
+    dataset_fingerprint: str,
+    experiment_name: Optional[str] = None,
+    tracking_uri: Optional[str] = None,
+    loss_metric: str = 'rmse',
+    max_results: int = 1000,
+) -> List[Tuple[Dict[str, str], float]]:
+    """
+    Fetch the (params, loss) pairs evaluated by previous tuning runs of the same model
+    class on the same data from the tracking store: every trial of runs that logged
+    TRIALS_ARTIFACT, the best params of older ones. Params are returned as strings.
+
+    Only runs tagged with dataset_fingerprint are matched: untagged history (runs
+    logged before the tag existed, or by other blocks) is ignored, since its data and
+    folds are unknown.
+    """
+    mlflow.set_tracking_uri(tracking_uri or DEFAULT_TRACKING_URI)
+    client = MlflowClient()
+
+    experiment = client.get_experiment_by_name(experiment_name or DEFAULT_EXPERIMENT_NAME)
+    if experiment is None:
+        return []
+
+    runs = client.search_runs(
+        [experiment.experiment_id],
+        filter_string=(
+            f"tags.model = '{model_class.__name__}' "
+            f"and tags.{DATASET_FINGERPRINT_TAG} = '{dataset_fingerprint}'"
+        ),
+        max_results=max_results,
+    )
+
+    history = []
+    for run in runs:
+        history.extend(_run_trials(client, run, loss_metric))
+
+    return history
+
+
+def _parse_value(label: str, value: str, choices: Dict[str, List]):
+    if label in choices:
+        # hp.choice stores the index of the option, not the option itself.
+        options = [str(option) for option in choices[label]]
+        return options.index(value)
+
+    return float(value)
+
+
+def build_warm_start_trials(
+    space: Dict,
+    choices: Dict[str, List],
+    history: List[Tuple[Dict[str, str], float]],
+) -> Trials:
+    """
+    Turn historical (params, loss) pairs into completed hyperopt trials so TPE starts
+    from the prior evaluations instead of from scratch. Runs that do not cover every
+    searchable hyperparameter of the space are skipped.
+    """
+    labels = [key for key, value in space.items() if isinstance(value, Apply)]
+    trials = Trials()
+
+    for params, loss in history:
+        try:
+            vals = {label: [_parse_value(label, params[label], choices)] for label in labels}
+        except (KeyError, ValueError):
+            continue
+
+        tid = len(trials.trials)
+        misc = dict(
+            tid=tid,
+            cmd=('domain_attachment', 'FMinIter_Domain'),
+            workdir=None,
+            idxs={label: [tid] for label in labels},
+            vals=vals,
+        )
+        docs = trials.new_trial_docs(
+            [tid], [None], [dict(loss=loss, status=STATUS_OK)], [misc],
+        )
+        for doc in docs:
+            doc['state'] = JOB_STATE_DONE
+        trials.insert_trial_docs(docs)
+        trials.refresh()
+
+    return trials
@@ -0,0 +1,157 @@
+"""
+Score registered models across past months of data.
+
+    python -m mlops.utils.models.backtest \
+        --model-uri models:/randomforest-reg-v2/Production \
+        --model-uri runs:/<run_id>/model \
+        --months 2023-01 2023-02 2023-03
+
+Months are scored concurrently, one process per month. Every worker loads each model
+once, and encodes a month once per distinct DictVectorizer, so models trained with the
+same vectorizer share the encoded matrix.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import mlflow
+import numpy as np
+import pandas as pd
+
+from mlops.utils.artifact_store import run_object_path
+from mlops.utils.data_preparation.cleaning import clean_taxi_data
+from mlops.utils.data_preparation.feature_engineering import engineer_features
+from mlops.utils.data_preparation.feature_selector import select_features
+from mlops.utils.logging import DEFAULT_TRACKING_URI
+
+DEFAULT_DATASET_DIR = os.path.abspath(os.path.join(os.getcwd(), '..', 'Dataset'))
+MONTH_FILE_PATTERN = re.compile(r'chicago_taxi_(\d{4})_(\d{2})\.parquet$')
+
+# Per worker process: model URI -> (model, vectorizer hash), vectorizer hash -> vectorizer
+_MODELS: Dict[str, Tuple[object, str]] = {}
+_VECTORIZERS: Dict[str, object] = {}
+
+
+def resolve_vectorizer(model_uri: str) -> str:
+    """
+    Local path of the DictVectorizer logged with the model's run.
+    """
+    return run_object_path(mlflow.models.get_model_info(model_uri).run_id)
+
+
+def _init_worker(tracking_uri: str, models: Dict[str, str]) -> None:
+    mlflow.set_tracking_uri(tracking_uri)
+
+    for model_uri, vectorizer_path in models.items():
+        with open(vectorizer_path, 'rb') as file:
+            payload = file.read()
+        vectorizer_hash = hashlib.sha256(payload).hexdigest()
+        _VECTORIZERS.setdefault(vectorizer_hash, pickle.loads(payload))
+        _MODELS[model_uri] = (mlflow.pyfunc.load_model(model_uri), vectorizer_hash)
+
+
+def _score_month(path: str, target: str) -> List[Dict]:
+    df = engineer_features(clean_taxi_data(pd.read_parquet(path)))
+    y = pd.to_numeric(df[target], errors='coerce')
+    df = df[y.notna()]
+    y = y[y.notna()].to_numpy()
+    records = select_features(df).to_dict(orient='records')
+
+    month = '-'.join(MONTH_FILE_PATTERN.search(path).groups())
+    encoded = {}
+    rows = []
+    for model_uri, (model, vectorizer_hash) in _MODELS.items():
+        if vectorizer_hash not in encoded:
+            encoded[vectorizer_hash] = _VECTORIZERS[vectorizer_hash].transform(records)
+        X = encoded[vectorizer_hash]
+
+        start = time.perf_counter()
+        y_pred = np.asarray(model.predict(X)).ravel()
+        predict_seconds = time.perf_counter() - start
+
+        rows.append(dict(
+            month=month,
+            model_uri=model_uri,
+            rows=len(y),
+            rmse=float(np.sqrt(np.mean((y - y_pred) ** 2))),
+            predict_ms=predict_seconds * 1000,
+            us_per_row=predict_seconds * 1e6 / max(len(y), 1),
+        ))
+
+    return rows
+
+
+def backtest(
+    model_uris: List[str],
+    months: Optional[List[str]] = None,
+    dataset_dir: str = DEFAULT_DATASET_DIR,
+    target: str = 'duration_minutes',
+    tracking_uri: str = DEFAULT_TRACKING_URI,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    RMSE and predict latency of every model on every month, one row per (month, model).
+    months are 'YYYY-MM' strings; all months of dataset_dir by default.
+    """
+    mlflow.set_tracking_uri(tracking_uri)
+
+    paths = sorted(
+        path for path in glob.glob(os.path.join(dataset_dir, 'chicago_taxi_*.parquet'))
+        if MONTH_FILE_PATTERN.search(path)
+    )
+    if months:
+        paths = [path for path in paths if '-'.join(MONTH_FILE_PATTERN.search(path).groups()) in months]
+    if not paths:
+        raise ValueError(f'No month files found in {dataset_dir} for {months or "any month"}')
+
+    # Artifacts are downloaded once here; workers only read the local copies
+    models = {model_uri: resolve_vectorizer(model_uri) for model_uri in model_uris}
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers or min(len(paths), os.cpu_count() or 1),
+        initializer=_init_worker,
+        initargs=(tracking_uri, models),
+    ) as executor:
+        results = executor.map(_score_month, paths, [target] * len(paths))
+        rows = [row for month_rows in results for row in month_rows]
+
+    return pd.DataFrame(rows).sort_values(['month', 'model_uri']).reset_index(drop=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Score MLflow models across past months of data.')
+    parser.add_argument('--model-uri', action='append', required=True, help='MLflow model URI, repeatable')
+    parser.add_argument('--months', nargs='*', help='Months to score as YYYY-MM (default: all available)')
+    parser.add_argument('--dataset-dir', default=DEFAULT_DATASET_DIR, help='Directory of the monthly Parquet files')
+    parser.add_argument('--target', default='duration_minutes')
+    parser.add_argument('--tracking-uri', default=os.getenv('MLFLOW_TRACKING_URI', DEFAULT_TRACKING_URI))
+    parser.add_argument('--max-workers', type=int, default=None)
+    parser.add_argument('--output', help='Also write the table to this CSV file')
+
+    args = parser.parse_args()
+
+    table = backtest(
+        args.model_uri,
+        months=args.months,
+        dataset_dir=args.dataset_dir,
+        target=args.target,
+        tracking_uri=args.tracking_uri,
+        max_workers=args.max_workers,
+    )
+
+    print(table.to_string(index=False, float_format=lambda value: f'{value:.4f}'))
+    print()
+    print(table.pivot(index='month', columns='model_uri', values='rmse').to_string(float_format=lambda value: f'{value:.4f}'))
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import pickle
+import time
+from typing import Callable, Dict, Union
+
+import numpy as np
+import xgboost as xgb
+from scipy.sparse._csr import csr_matrix
+from sklearn.base import BaseEstimator
+
+
+def _median_ms(fn: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings) * 1000)
+
+
+def benchmark_model(
+    model: Union[BaseEstimator, xgb.Booster],
+    X_probe: csr_matrix,
+    repeats: int = 20,
+) -> Dict[str, float]:
+    """
+    Serving cost of a fitted model on a fixed probe set: median single-row and batch
+    predict latency, pickled size and unpickling time.
+    """
+    predict = model.predict
+    if isinstance(model, xgb.Booster):
+        predict = lambda X: model.predict(xgb.DMatrix(X))
+
+    single_row = X_probe[:1]
+    predict(single_row)  # Warm up lazily initialized state before timing
+
+    payload = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return dict(
+        single_row_ms=_median_ms(lambda: predict(single_row), repeats),
+        batch_ms=_median_ms(lambda: predict(X_probe), max(3, repeats // 5)),
+        batch_rows=float(X_probe.shape[0]),
+        size_mb=len(payload) / 1024 ** 2,
+        load_ms=_median_ms(lambda: pickle.loads(payload), 3),
+    )
@@ -0,0 +1,203 @@
+"""
+Array-backed inference for sklearn RandomForest/ExtraTrees regressors.
+
+This module only depends on NumPy (and SciPy for sparse input), so it is shipped
+as-is with the MLflow model (code_paths) and used as its pyfunc loader_module.
+Batches of LARGE_BATCH_ROWS or more are handed to sklearn's compiled tree
+traversal, rebuilt from the same arrays on first use.
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+METADATA_FILENAME = 'compact_forest.json'
+
+# From about this many rows, sklearn's Cython traversal beats the vectorized walk.
+LARGE_BATCH_ROWS = 256
+
+
+def _round_down_float32(values: np.ndarray) -> np.ndarray:
+    # sklearn compares float32 features against float64 thresholds. Rounding each
+    # threshold down to the nearest float32 keeps every `x <= threshold` decision
+    # identical for float32 x.
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+
+    return rounded
+
+
+class CompactForest:
+    """
+    All trees of a forest flattened into contiguous arrays (feature/left/right/roots as
+    int32, threshold/value as float32). Leaves point to themselves. Small batches walk
+    all trees in lockstep, dropping each (row, tree) pair once it reaches a leaf and
+    densifying only the feature columns used by some split. Large batches go through
+    sklearn trees built from the same arrays.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+        # Derived at load time, not stored: leaf mask, children indexed by 2 * node +
+        # go_left, and the split features remapped to the columns that are actually used.
+        self._is_leaf = left == np.arange(len(left), dtype=left.dtype)
+        self._children = np.stack([right, left], axis=1).ravel()
+        self._columns = np.unique(feature[~self._is_leaf])
+        self._column_index = np.searchsorted(self._columns, feature).astype(np.int32)
+        self._sklearn_trees = None
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'CompactForest':
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        feature, threshold, left, right, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(_round_down_float32(tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            value.append(tree.value[:, 0, 0])
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            value=np.concatenate(value).astype(np.float32),
+            roots=offsets[:-1].astype(np.int32),
+            max_depth=int(max(tree.max_depth for tree in trees)),
+            n_features=int(model.n_features_in_),
+        )
+
+    def predict(self, X, batch_size: int = 4096) -> np.ndarray:
+        if X.shape[0] >= LARGE_BATCH_ROWS:
+            return self._predict_sklearn(X)
+
+        n_samples = X.shape[0]
+        n_trees = len(self.roots)
+        predictions = np.empty(n_samples, dtype=np.float64)
+
+        for start in range(0, n_samples, batch_size):
+            batch = X[start:start + batch_size][:, self._columns]
+            batch = batch.toarray() if hasattr(batch, 'toarray') else np.asarray(batch)
+            batch = np.ascontiguousarray(batch, dtype=np.float32)
+            n_rows, width = batch.shape
+            values = batch.ravel()
+
+            # One entry per (row, tree) pair that has not reached a leaf yet
+            rows = np.repeat(np.arange(n_rows), n_trees)
+            offsets = rows * width
+            nodes = np.tile(self.roots, n_rows).astype(np.int64)
+            totals = np.zeros(n_rows, dtype=np.float64)
+
+            while nodes.size:
+                done = self._is_leaf[nodes]
+                if done.any():
+                    totals += np.bincount(rows[done], weights=self.value[nodes[done]], minlength=n_rows)
+                    rows, offsets, nodes = rows[~done], offsets[~done], nodes[~done]
+
+                go_left = values[offsets + self._column_index[nodes]] <= self.threshold[nodes]
+                nodes = self._children[2 * nodes + go_left]
+
+            predictions[start:start + n_rows] = totals / n_trees
+
+        return predictions
+
+    def _predict_sklearn(self, X) -> np.ndarray:
+        from sklearn.utils import check_array
+
+        if self._sklearn_trees is None:
+            self._sklearn_trees = self._build_sklearn_trees()
+
+        X = check_array(X, accept_sparse='csr', dtype=np.float32)
+        if hasattr(X, 'indices'):
+            X.indices = X.indices.astype(np.int32, copy=False)
+            X.indptr = X.indptr.astype(np.int32, copy=False)
+
+        totals = np.zeros(X.shape[0], dtype=np.float64)
+        for tree in self._sklearn_trees:
+            totals += tree.predict(X)[:, 0]
+
+        return totals / len(self._sklearn_trees)
+
+    def _build_sklearn_trees(self) -> list:
+        from sklearn.tree._tree import NODE_DTYPE, Tree
+
+        trees = []
+        bounds = [*self.roots, len(self.left)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            is_leaf = self._is_leaf[start:end]
+            nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+            nodes['left_child'] = np.where(is_leaf, -1, self.left[start:end] - start)
+            nodes['right_child'] = np.where(is_leaf, -1, self.right[start:end] - start)
+            nodes['feature'] = np.where(is_leaf, -2, self.feature[start:end])
+            # Thresholds were rounded down to float32, decisions stay the same
+            nodes['threshold'] = np.where(is_leaf, -2.0, self.threshold[start:end])
+
+            tree = Tree(self.n_features, np.array([1], dtype=np.intp), 1)
+            tree.__setstate__(dict(
+                max_depth=self.max_depth,
+                node_count=end - start,
+                nodes=nodes,
+                values=self.value[start:end].astype(np.float64).reshape(-1, 1, 1),
+            ))
+            trees.append(tree)
+
+        return trees
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+
+        with open(os.path.join(directory, METADATA_FILENAME), 'w') as file:
+            json.dump(dict(max_depth=self.max_depth, n_features=self.n_features), file)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'CompactForest':
+        """
+        With mmap=True the arrays are memory-mapped read-only: loading is near instant
+        and worker processes serving the same model share the OS page cache.
+        """
+        with open(os.path.join(directory, METADATA_FILENAME), 'r') as file:
+            metadata = json.load(file)
+
+        mmap_mode: Optional[str] = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+
+        return cls(**arrays, **metadata)
+
+
+def _load_pyfunc(path: str) -> CompactForest:
+    """
+    MLflow pyfunc entry point (loader_module='compact_forest').
+    """
+    return CompactForest.load(path)
@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pandas import Series
+from scipy.sparse._csr import csr_matrix
+from sklearn.base import BaseEstimator
+from sklearn.metrics import mean_squared_error, root_mean_squared_error
+
+# Data shared with fold workers. Set by the pool initializer: with the fork start method
+# the CSR buffers are inherited copy-on-write instead of being pickled to every worker.
+_SHARED: Dict = {}
+
+
+def rolling_origin_folds(
+    timestamps: Series,
+    n_folds: int = 4,
+    max_train_size: Optional[int] = None,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Row indices of rolling-origin folds: the rows are sorted by timestamp once and cut
+    into n_folds + 1 consecutive blocks. Fold k trains on blocks 0..k-1 (or only the
+    latest max_train_size of those rows) and validates on block k.
+    """
+    order = np.argsort(np.asarray(timestamps), kind='stable')
+    blocks = np.array_split(order, n_folds + 1)
+
+    folds = []
+    for k in range(1, n_folds + 1):
+        train_idx = np.concatenate(blocks[:k])
+        if max_train_size:
+            train_idx = train_idx[-max_train_size:]
+        # Sorted row indices make the CSR row slicing sequential.
+        folds.append((np.sort(train_idx), np.sort(blocks[k])))
+
+    return folds
+
+
+def regression_metrics(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    eval_metric: Optional[Callable] = None,
+) -> Dict[str, float]:
+    """
+    mse and rmse of the predictions, plus eval_metric under its own name when it is
+    neither of them.
+    """
+    mse = float(mean_squared_error(y_true, y_pred))
+    metrics = dict(mse=mse, rmse=float(np.sqrt(mse)))
+
+    if eval_metric is not None and eval_metric not in (mean_squared_error, root_mean_squared_error):
+        metrics[eval_metric.__name__] = float(eval_metric(y_true, y_pred))
+
+    return metrics
+
+
+def _init_worker(X: csr_matrix, y: np.ndarray, folds: List[Tuple[np.ndarray, np.ndarray]]) -> None:
+    _SHARED.update(X=X, y=y, folds=folds)
+
+
+def _fit_fold(
+    fold: int,
+    model_class: Callable[..., BaseEstimator],
+    params: Dict,
+    eval_metric: Callable,
+    fit_params: Dict,
+) -> Dict[str, float]:
+    X, y = _SHARED['X'], _SHARED['y']
+    train_idx, val_idx = _SHARED['folds'][fold]
+
+    start = time.perf_counter()
+    model = model_class(**params)
+    model.fit(X[train_idx], y[train_idx], **fit_params)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X[val_idx])
+    predict_seconds = time.perf_counter() - start
+
+    metrics = regression_metrics(y[val_idx], y_pred, eval_metric)
+
+    return dict(metrics, fit_seconds=fit_seconds, predict_seconds=predict_seconds)
+
+
+@contextmanager
+def fold_executor(
+    X: csr_matrix,
+    y: Series,
+    folds: List[Tuple[np.ndarray, np.ndarray]],
+    max_workers: Optional[int] = None,
+) -> Iterator[ProcessPoolExecutor]:
+    """
+    Process pool holding X, y and the fold indices, to be reused for every trial.
+    """
+    context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers or min(len(folds), os.cpu_count() or 1),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(X, np.asarray(y), folds),
+    ) as executor:
+        yield executor
+
+
+def cross_validate(
+    model_class: Callable[..., BaseEstimator],
+    params: Dict,
+    executor: ProcessPoolExecutor,
+    n_folds: int,
+    eval_metric: Callable = mean_squared_error,
+    fit_params: Optional[Dict] = None,
+) -> Dict[str, float]:
+    """
+    Fit and score all folds concurrently. Returns the mean mse/rmse (usable as the
+    hyperopt loss), rmse_std, and the metrics and timings of every fold, flattened as
+    <metric>_fold_<k> so they can be logged to MLflow as-is.
+    """
+    futures = [
+        executor.submit(_fit_fold, fold, model_class, params, eval_metric, fit_params or {})
+        for fold in range(n_folds)
+    ]
+    results = [future.result() for future in futures]
+
+    metrics = dict(
+        mse=float(np.mean([result['mse'] for result in results])),
+        rmse=float(np.mean([result['rmse'] for result in results])),
+        rmse_std=float(np.std([result['rmse'] for result in results])),
+        fit_seconds=float(np.sum([result['fit_seconds'] for result in results])),
+    )
+    for fold, result in enumerate(results):
+        for key, value in result.items():
+            metrics[f'{key}_fold_{fold}'] = float(value)
+
+    return metrics
@@ -0,0 +1,182 @@
+import glob
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from mlops.utils.data_preparation.cleaning import clean_taxi_data
+from mlops.utils.data_preparation.feature_engineering import engineer_features
+from mlops.utils.data_preparation.feature_selector import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+
+STATE_FILENAME = 'incremental_state.json'
+
+
+class IncrementalRegressor(BaseEstimator, RegressorMixin):
+    """
+    Linear model updatable one shard at a time. Categoricals are hashed into a fixed
+    n_features space, so unseen PU_DO pairs need no vocabulary refit, and numericals are
+    standardized with running statistics.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 16,
+        alpha: float = 1e-5,
+        eta0: float = 0.01,
+        loss: str = 'huber',
+        random_state: int = 42,
+    ):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.eta0 = eta0
+        self.loss = loss
+        self.random_state = random_state
+
+    def _init_state(self) -> None:
+        self.hasher_ = FeatureHasher(n_features=self.n_features, input_type='string')
+        self.scaler_ = StandardScaler()
+        self.regressor_ = SGDRegressor(
+            loss=self.loss,
+            alpha=self.alpha,
+            eta0=self.eta0,
+            learning_rate='invscaling',
+            random_state=self.random_state,
+        )
+
+    def _transform(self, df: pd.DataFrame, update_scaler: bool = False) -> scipy.sparse.csr_matrix:
+        numerical = df[NUMERICAL_FEATURES].astype(np.float64).to_numpy()
+        if update_scaler:
+            self.scaler_.partial_fit(numerical)
+
+        # One "column=value" token per categorical feature and row
+        categorical = self.hasher_.transform(zip(*[
+            f'{column}=' + df[column].astype(str) for column in CATEGORICAL_FEATURES
+        ]))
+
+        return scipy.sparse.hstack(
+            [scipy.sparse.csr_matrix(self.scaler_.transform(numerical)), categorical],
+            format='csr',
+        )
+
+    def partial_fit(self, df: pd.DataFrame, y: Iterable[float]) -> 'IncrementalRegressor':
+        if not hasattr(self, 'regressor_'):
+            self._init_state()
+
+        X = self._transform(df, update_scaler=True)
+        self.regressor_.partial_fit(X, np.asarray(y, dtype=np.float64))
+
+        return self
+
+    def fit(self, df: pd.DataFrame, y: Iterable[float]) -> 'IncrementalRegressor':
+        self._init_state()
+
+        return self.partial_fit(df, y)
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        return self.regressor_.predict(self._transform(df))
+
+
+def load_shard(path: str, target: str = 'duration_minutes') -> pd.DataFrame:
+    """
+    Raw monthly trips file, cleaned and featurized with the training pipeline's steps.
+    """
+    df = engineer_features(clean_taxi_data(pd.read_parquet(path)))
+
+    return df.dropna(subset=CATEGORICAL_FEATURES + NUMERICAL_FEATURES + [target])
+
+
+def _fit_shards(
+    model: IncrementalRegressor,
+    shard_paths: List[str],
+    target: str,
+    chunk_size: int,
+) -> IncrementalRegressor:
+    for path in shard_paths:
+        df = load_shard(path, target)
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            model.partial_fit(chunk, chunk[target])
+
+    return model
+
+
+def update_incremental_model(
+    shard_pattern: str,
+    model_dir: str,
+    target: str = 'duration_minutes',
+    full_retrain_every: int = 12,
+    full_retrain_window: int = 12,
+    chunk_size: int = 50_000,
+    model_params: Optional[Dict] = None,
+) -> Dict:
+    """
+    Update the model in model_dir with the shards matching shard_pattern that were not
+    consumed yet, in sorted (chronological) order. Every full_retrain_every new shards
+    the model is instead rebuilt from nothing on the latest full_retrain_window shards,
+    to shed drift accumulated by in-place updates.
+
+    Each new shard is scored before it is learned (prequential evaluation), so the
+    returned rmse per shard is an honest out-of-sample estimate.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, 'model.joblib')
+    state_path = os.path.join(model_dir, STATE_FILENAME)
+
+    state = dict(consumed=[], shards_since_full_retrain=0)
+    if os.path.exists(state_path):
+        with open(state_path, 'r') as file:
+            state = json.load(file)
+
+    model = joblib.load(model_path) if os.path.exists(model_path) else IncrementalRegressor(**(model_params or {}))
+
+    all_shards = sorted(glob.glob(shard_pattern))
+    new_shards = [path for path in all_shards if os.path.basename(path) not in state['consumed']]
+
+    metrics = {}
+    full_retrain = False
+    for path in new_shards:
+        df = load_shard(path, target)
+
+        if hasattr(model, 'regressor_') and len(df):
+            y_pred = model.predict(df)
+            metrics[os.path.basename(path)] = float(np.sqrt(np.mean((df[target].to_numpy() - y_pred) ** 2)))
+
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            model.partial_fit(chunk, chunk[target])
+
+        state['consumed'].append(os.path.basename(path))
+        state['shards_since_full_retrain'] += 1
+
+        if full_retrain_every and state['shards_since_full_retrain'] >= full_retrain_every:
+            consumed = [p for p in all_shards if os.path.basename(p) in state['consumed']]
+            window = consumed[-full_retrain_window:]
+            print(f"🔁 Full retrain on the latest {len(window)} shards")
+
+            model = _fit_shards(IncrementalRegressor(**model.get_params()), window, target, chunk_size)
+            state['shards_since_full_retrain'] = 0
+            full_retrain = True
+
+    # Persist model before state, so a crash in between only replays the last shards
+    tmp_path = f'{model_path}.tmp'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, model_path)
+
+    with open(f'{state_path}.tmp', 'w') as file:
+        json.dump(state, file)
+    os.replace(f'{state_path}.tmp', state_path)
+
+    return dict(
+        model=model,
+        new_shards=[os.path.basename(path) for path in new_shards],
+        prequential_rmse=metrics,
+        full_retrain=full_retrain,
+    )
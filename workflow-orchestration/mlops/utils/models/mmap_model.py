@@ -0,0 +1,87 @@
+"""
+Model storage whose numeric arrays are memory-mapped at load.
+
+Models are pickled with protocol 5 and their contiguous buffers (numpy arrays) written
+out-of-band into one file, uncompressed and page-aligned. Loading maps that file
+read-only and hands the mapped slices back to pickle, so arrays are rebuilt without
+copying: startup does not read the whole model, and every process serving the same
+model shares the OS page cache.
+
+sklearn trees copy their nodes into their own buffer when unpickled, which defeats the
+mapping, so forests are stored as CompactForest arrays instead (same predictions).
+
+This module only depends on NumPy, so it is shipped as-is with the MLflow model
+(code_paths) and used as its pyfunc loader_module.
+"""
+import json
+import mmap
+import os
+import pickle
+from typing import List
+
+try:
+    from mlops.utils.models.compact_forest import CompactForest
+except ImportError:  # Shipped standalone next to compact_forest.py
+    from compact_forest import CompactForest
+
+FORMAT_FILENAME = 'mmap_model.json'
+HEADER_FILENAME = 'model.pkl'
+BUFFERS_FILENAME = 'buffers.bin'
+PAGE_SIZE = 4096
+
+COMPACT_FOREST_CLASSES = ('ExtraTreesRegressor', 'RandomForestRegressor')
+
+
+def save_model(model: object, path: str, compact_forests: bool = True) -> None:
+    os.makedirs(path, exist_ok=True)
+
+    if compact_forests and model.__class__.__name__ in COMPACT_FOREST_CLASSES:
+        CompactForest.from_sklearn(model).save(path)
+        layout = dict(kind='compact_forest')
+    else:
+        buffers: List[pickle.PickleBuffer] = []
+        header = pickle.dumps(model, protocol=5, buffer_callback=buffers.append)
+        with open(os.path.join(path, HEADER_FILENAME), 'wb') as file:
+            file.write(header)
+
+        # Each buffer starts on a page boundary
+        offsets = []
+        with open(os.path.join(path, BUFFERS_FILENAME), 'wb') as file:
+            for buffer in buffers:
+                raw = buffer.raw()
+                offset = -(-file.tell() // PAGE_SIZE) * PAGE_SIZE
+                file.write(b'\0' * (offset - file.tell()))
+                file.write(raw)
+                offsets.append([offset, raw.nbytes])
+
+        layout = dict(kind='pickle5', buffers=offsets)
+
+    with open(os.path.join(path, FORMAT_FILENAME), 'w') as file:
+        json.dump(layout, file)
+
+
+def load_model(path: str) -> object:
+    with open(os.path.join(path, FORMAT_FILENAME), 'r') as file:
+        layout = json.load(file)
+
+    if layout['kind'] == 'compact_forest':
+        return CompactForest.load(path, mmap=True)
+
+    with open(os.path.join(path, HEADER_FILENAME), 'rb') as file:
+        header = file.read()
+
+    buffers = []
+    if layout['buffers']:
+        with open(os.path.join(path, BUFFERS_FILENAME), 'rb') as file:
+            # The mapping outlives the file handle; arrays keep it alive through their buffers
+            mapped = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        buffers = [mapped[offset:offset + length] for offset, length in layout['buffers']]
+
+    return pickle.loads(header, buffers=buffers)
+
+
+def _load_pyfunc(path: str) -> object:
+    """
+    MLflow pyfunc entry point (loader_module='mmap_model').
+    """
+    return load_model(path)
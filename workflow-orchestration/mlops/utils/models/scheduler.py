@@ -0,0 +1,88 @@
+import inspect
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sklearn.base import BaseEstimator
+
+T = TypeVar('T')
+
+
+def split_cpu_budget(
+    n_tasks: int,
+    cpu_budget: Optional[int] = None,
+    n_serial_tasks: int = 0,
+) -> Tuple[int, int]:
+    """
+    Split a CPU budget into (outer, inner): how many tasks run at once and how many
+    cores (n_jobs) each task that accepts n_jobs gets. The n_serial_tasks that ignore
+    n_jobs only take one core each while they run, the rest goes to the others.
+    """
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    outer = max(1, min(n_tasks, cpu_budget))
+
+    serial_slots = min(n_serial_tasks, outer)
+    parallel_slots = min(n_tasks - n_serial_tasks, max(1, outer - serial_slots))
+    inner = max(1, (cpu_budget - serial_slots) // max(1, parallel_slots))
+
+    return outer, inner
+
+
+def supports_n_jobs(model_class: Callable[..., BaseEstimator]) -> bool:
+    return 'n_jobs' in inspect.signature(model_class).parameters
+
+
+def run_model_families(
+    model_names: List[str],
+    tune: Callable[[str, int], T],
+    publish: Optional[Callable[[str, T], None]] = None,
+    cpu_budget: Optional[int] = None,
+    accepts_n_jobs: Callable[[str], bool] = lambda name: True,
+) -> List[T]:
+    """
+    Tune several model families concurrently under a global CPU budget.
+
+    tune(name, n_jobs) runs in a pool of `outer` threads. Families for which
+    accepts_n_jobs(name) is true get `inner` cores for their estimator, the others
+    n_jobs=1, since they would leave extra cores idle. As soon as a family finishes,
+    publish(name, result) (e.g. logging and artifact upload) is queued on a separate
+    thread, so it overlaps with the families that are still training. Results are
+    returned in model_names order.
+    """
+    if len(set(model_names)) != len(model_names):
+        raise ValueError(f'Model families must be unique: {model_names}')
+
+    parallel = {name: accepts_n_jobs(name) for name in model_names}
+    outer, inner = split_cpu_budget(
+        len(model_names), cpu_budget, n_serial_tasks=sum(not p for p in parallel.values()),
+    )
+    print(
+        f'Tuning {len(model_names)} model families: {outer} concurrently, '
+        f'n_jobs={inner} for {sum(parallel.values())} of them'
+    )
+
+    results: Dict[str, T] = {}
+    publishing: List[Future] = []
+
+    with ThreadPoolExecutor(max_workers=1) as publisher:
+        def __on_done(name: str, future: Future) -> None:
+            if future.exception() is None:
+                results[name] = future.result()
+                if publish:
+                    publishing.append(publisher.submit(publish, name, results[name]))
+
+        with ThreadPoolExecutor(max_workers=outer) as pool:
+            tuning = []
+            for name in model_names:
+                future = pool.submit(tune, name, inner if parallel[name] else 1)
+                future.add_done_callback(lambda f, name=name: __on_done(name, f))
+                tuning.append(future)
+
+            # Re-raise the first tuning failure, if any.
+            for future in tuning:
+                future.result()
+
+        for future in publishing:
+            future.result()
+
+    return [results[name] for name in model_names]
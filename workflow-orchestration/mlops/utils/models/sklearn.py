@@ -1,20 +1,48 @@
-from typing import Callable, Dict, Optional, Tuple, Union
+import copy
+import importlib
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
+import joblib
 import numpy as np
 import sklearn
 from hyperopt import STATUS_OK, Trials, fmin, hp, tpe
 from pandas import Series
 from scipy.sparse._csr import csr_matrix
 from sklearn.base import BaseEstimator
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
 from sklearn.metrics import mean_squared_error
 from sklearn.metrics import root_mean_squared_error
+from sklearn.utils import check_array
 
-from mlops.utils.hyperparameters.shared import build_hyperparameters_space
+from mlops.utils.fingerprint import dataset_fingerprint as compute_dataset_fingerprint
+from mlops.utils.models.cross_validation import cross_validate, fold_executor, regression_metrics
+from mlops.utils.hyperparameters.shared import (
+    build_hyperparameters_space,
+    n_estimators_checkpoints,
+)
+from mlops.utils.hyperparameters.trial_cache import TrialCache
+from mlops.utils.hyperparameters.warm_start import (
+    build_warm_start_trials,
+    load_tuning_history,
+)
 
 HYPERPARAMETERS_WITH_CHOICE_INDEX = [
     'fit_intercept',
 ]
 
+# Models estimated above this size are kept on disk instead of in memory while tuning.
+DEFAULT_SPILL_THRESHOLD_BYTES = 256 * 1024 ** 2
+# sklearn's tree Node struct is 64 bytes.
+TREE_NODE_BYTES = 64
+
+# Ensembles whose trees are independent, so a forest grown with warm_start to n trees is
+# the same forest as one fitted with n_estimators=n.
+GROWABLE_FORESTS = (ExtraTreesRegressor, RandomForestRegressor)
+
 
 def load_class(module_and_class_name: str) -> BaseEstimator:
     """
@@ -22,14 +50,43 @@ def load_class(module_and_class_name: str) -> BaseEstimator:
         ensemble.GradientBoostingRegressor
         ensemble.RandomForestRegressor
         linear_model.LinearRegression
+        custom_models.hist_gradient_boosting.CategoricalHistGradientBoostingRegressor
     """
     parts = module_and_class_name.split('.')
+    if parts[0] == 'custom_models':
+        module = importlib.import_module('.'.join(['mlops.utils', *parts[:-1]]))
+        return getattr(module, parts[-1])
+
     cls = sklearn
     for part in parts:
         cls = getattr(cls, part)
 
     return cls
 
+def encoder_params(model_class: Callable[..., BaseEstimator], dv) -> Dict:
+    """
+    Constructor arguments describing the encoded columns, for models that decode the
+    DictVectorizer output themselves. Kept apart from the tuned hyperparameters.
+    """
+    if 'feature_names' in getattr(model_class, '_get_param_names', lambda: [])():
+        return dict(feature_names=list(dv.feature_names_))
+
+    return {}
+
+def estimate_model_size(model: BaseEstimator) -> int:
+    """
+    Rough in-memory size of the fitted trees of a model in bytes, without pickling it.
+    Non tree-based models are considered negligible.
+    """
+    size = 0
+    for estimator in np.ravel(getattr(model, 'estimators_', [model])):
+        tree = getattr(estimator, 'tree_', None)
+        if tree is not None:
+            size += tree.node_count * TREE_NODE_BYTES + tree.value.nbytes
+
+    return size
+
+
 def train_model(
     model: BaseEstimator,
     X_train: csr_matrix,
@@ -47,12 +104,56 @@ def train_model(
     if X_val is not None and y_val is not None:
         y_pred = model.predict(X_val)
 
-        mse = eval_metric(y_val, y_pred)
-        rmse = np.sqrt(mse)
-        metrics = dict(mse=mse, rmse=rmse)
+        metrics = regression_metrics(y_val, y_pred, eval_metric)
 
     return model, metrics, y_pred
 
+def grow_forest(
+    model_class: Callable[..., BaseEstimator],
+    params: Dict,
+    checkpoints: List[int],
+    X_train: csr_matrix,
+    y_train: Series,
+    X_val: csr_matrix,
+    y_val: Series,
+    eval_metric: Callable = mean_squared_error,
+    fit_params: Optional[Dict] = None,
+) -> Tuple[BaseEstimator, Dict[int, Dict]]:
+    """
+    Fit a single forest with warm_start, adding trees up to each n_estimators checkpoint,
+    and score it at every checkpoint. Validation predictions are accumulated per new tree,
+    so each checkpoint only predicts with the trees added since the previous one.
+    """
+    model = model_class(**{**params, 'n_estimators': checkpoints[0], 'warm_start': True})
+    X_val_checked = check_array(X_val, accept_sparse='csr', dtype=np.float32)
+    prediction_sum = np.zeros(X_val.shape[0])
+
+    scores = {}
+    for n_estimators in checkpoints:
+        grown = len(getattr(model, 'estimators_', []))
+        model.set_params(n_estimators=n_estimators)
+        model.fit(X_train, y_train, **(fit_params or {}))
+
+        for tree in model.estimators_[grown:]:
+            prediction_sum += tree.predict(X_val_checked, check_input=False)
+
+        scores[n_estimators] = regression_metrics(y_val, prediction_sum / n_estimators, eval_metric)
+
+    return model, scores
+
+
+def truncate_forest(model: BaseEstimator, n_estimators: int) -> BaseEstimator:
+    """
+    The forest made of the first n_estimators trees of a grown forest (trees are shared).
+    """
+    truncated = copy.copy(model)
+    truncated.estimators_ = model.estimators_[:n_estimators]
+    truncated.n_estimators = n_estimators
+    truncated.warm_start = False
+
+    return truncated
+
+
 def tune_hyperparameters(
     model_class: Callable[..., BaseEstimator],
     X_train: csr_matrix,
@@ -63,10 +164,105 @@ def tune_hyperparameters(
     eval_metric: Callable[[Series, Series], float] = root_mean_squared_error,
     fit_params: Optional[Dict] = None,
     hyperparameters: Optional[Dict] = None,
+    model_params: Optional[Dict] = None,
     max_evaluations: int = 50,
     random_state: int = 42,
-) -> Tuple[Dict, float]:  # <-- Add float to return best RMSE
+    warm_start: bool = False,
+    dataset_fingerprint: Optional[str] = None,
+    experiment_name: Optional[str] = None,
+    tracking_uri: Optional[str] = None,
+    return_best_model: bool = False,
+    spill_threshold_bytes: int = DEFAULT_SPILL_THRESHOLD_BYTES,
+    trial_cache: Optional[TrialCache] = None,
+    grow_forests: bool = False,
+    cv_folds: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None,
+    cv_workers: Optional[int] = None,
+    trials_log: Optional[List[Tuple[Dict, float]]] = None,
+) -> Union[Tuple[Dict, float], Tuple[Dict, float, Optional[BaseEstimator]]]:
+    """
+    model_params:
+        Constructor arguments applied to every trial that are not tuned (e.g. n_jobs).
+    warm_start:
+        Seed TPE with the trials of previous runs of the same model class on the same
+        data and folds (matched by dataset_fingerprint) from the MLflow tracking store,
+        see warm_start.load_tuning_history. The max_evaluations new trials are run on
+        top of the historical ones.
+    return_best_model:
+        Also return the estimator fitted in the best trial, so callers do not have to
+        refit it. Models larger than spill_threshold_bytes are held on disk until the
+        search is over. The model is None when the best result came from warm-start
+        history, or from the trial cache without a stored model.
+    trial_cache:
+        Look up each trial's metrics by (model class, params, model_params, data
+        fingerprint, library versions) before fitting, and store the metrics of every
+        trial that is fitted, plus the model of each trial that improved on the best
+        loss. The search is seeded with random_state so reruns propose the same trials.
+    grow_forests:
+        For RandomForest/ExtraTrees, grow one forest per configuration of the other
+        hyperparameters with warm_start and score it at every n_estimators value of the
+        search space, so later trials that only differ in n_estimators are lookups.
+    cv_folds:
+        Row indices of cross-validation folds over X_train/y_train (see
+        cross_validation.rolling_origin_folds). Each trial is then scored by the mean RMSE
+        of all folds, fitted concurrently in a process pool; X_val/y_val are not used and
+        no fitted model is returned.
+    trials_log:
+        List receiving the (params, rmse) of every trial evaluated by this search, to be
+        logged with warm_start.log_trials.
+    """
+    if (warm_start or trial_cache is not None) and dataset_fingerprint is None:
+        dataset_fingerprint = compute_dataset_fingerprint(
+            X_train, y_train, X_val, y_val, *(idx for fold in cv_folds or [] for idx in fold),
+        )
+
     best_loss = float("inf")
+    best_model: Optional[Union[BaseEstimator, str]] = None
+    spill_dir = tempfile.mkdtemp(prefix='best_model_') if return_best_model else None
+
+    def __keep(model: BaseEstimator) -> Union[BaseEstimator, str]:
+        if estimate_model_size(model) < spill_threshold_bytes:
+            return model
+
+        path = os.path.join(spill_dir, 'model.joblib')
+        joblib.dump(model, path)
+        return path
+
+    # Checkpoint scores per grown configuration, plus the forest of the configuration
+    # with the lowest checkpoint score (kept to hand out its truncations).
+    grow = grow_forests and model_class in GROWABLE_FORESTS and not cv_folds
+    checkpoints = n_estimators_checkpoints(model_class) if grow else []
+    grown_scores: Dict[Tuple, Dict[int, Dict]] = {}
+    grown_forest: Dict = dict(config=None, model=None, rmse=float('inf'))
+
+    def __train_grown(params: Dict) -> Optional[Tuple[Optional[BaseEstimator], Dict]]:
+        n_estimators = int(params['n_estimators'])
+        if n_estimators not in checkpoints:
+            return None
+
+        config = tuple(sorted((k, v) for k, v in params.items() if k != 'n_estimators'))
+        if config not in grown_scores:
+            model, scores = grow_forest(
+                model_class,
+                {**params, **(model_params or {})},
+                checkpoints,
+                X_train,
+                y_train,
+                X_val,
+                y_val,
+                eval_metric=eval_metric,
+                fit_params=fit_params,
+            )
+            grown_scores[config] = scores
+
+            rmse = min(score['rmse'] for score in scores.values())
+            if rmse < grown_forest['rmse']:
+                grown_forest.update(config=config, model=model, rmse=rmse)
+
+        model = None
+        if grown_forest['config'] == config:
+            model = truncate_forest(grown_forest['model'], n_estimators)
+
+        return model, grown_scores[config][n_estimators]
 
     def __objective(
         params: Dict,
@@ -79,20 +275,74 @@ def tune_hyperparameters(
         y_train=y_train,
         y_val=y_val,
     ) -> Dict[str, Union[float, str]]:
-        model, metrics, predictions = train_model(
-            model_class(**params),
-            X_train,
-            y_train,
-            X_val=X_val,
-            y_val=y_val,
-            eval_metric=eval_metric,
-            fit_params=fit_params,
-        )
+        nonlocal best_loss, best_model
+
+        cache_key = None
+        if trial_cache is not None:
+            cache_key = trial_cache.key(
+                model_class,
+                {
+                    **params,
+                    'eval_metric': eval_metric.__name__,
+                    'fit_params': fit_params,
+                    'model_params': model_params,
+                    'cv_folds': len(cv_folds) if cv_folds else None,
+                },
+                dataset_fingerprint,
+            )
+            cached_metrics = trial_cache.get(cache_key)
+            if cached_metrics is not None:
+                rmse = cached_metrics['rmse']
+                if trials_log is not None:
+                    trials_log.append((params, rmse))
+                if rmse < best_loss:
+                    best_loss = rmse
+                    if return_best_model:
+                        best_model = None
+                        # None when the model was not stored, the caller refits
+                        cached_model = trial_cache.get_model(cache_key)
+                        best_model = __keep(cached_model) if cached_model is not None else None
+                return dict(loss=rmse, status=STATUS_OK, cached=True)
+
+        grown = __train_grown(params) if grow else None
+        if grown:
+            model, metrics = grown
+            predictions = None
+        elif cv_folds:
+            metrics = cross_validate(
+                model_class,
+                {**params, **(model_params or {})},
+                executor,
+                len(cv_folds),
+                eval_metric=eval_metric,
+                fit_params=fit_params,
+            )
+            model, predictions = None, None
+        else:
+            model, metrics, predictions = train_model(
+                model_class(**{**params, **(model_params or {})}),
+                X_train,
+                y_train,
+                X_val=X_val,
+                y_val=y_val,
+                eval_metric=eval_metric,
+                fit_params=fit_params,
+            )
+
+        if cache_key is not None:
+            trial_cache.put(cache_key, metrics)
 
         rmse = metrics['rmse']
-        nonlocal best_loss
+        if trials_log is not None:
+            trials_log.append((params, rmse))
         if rmse < best_loss:
             best_loss = rmse
+            if return_best_model:
+                best_model = None  # Release the previous best before keeping the new one
+                # A grown configuration whose forest was not kept has no model, the caller refits
+                best_model = __keep(model) if model is not None else None
+                if cache_key is not None and model is not None:
+                    trial_cache.put_model(cache_key, model)
 
         if callback:
             callback(
@@ -110,13 +360,44 @@ def tune_hyperparameters(
         **(hyperparameters or {}),
     )
 
-    best_hyperparameters = fmin(
-        fn=__objective,
-        space=space,
-        algo=tpe.suggest,
-        max_evals=max_evaluations,
-        trials=Trials(),
-    )
+    trials = Trials()
+    if warm_start:
+        history = load_tuning_history(
+            model_class,
+            dataset_fingerprint,
+            experiment_name=experiment_name,
+            tracking_uri=tracking_uri,
+        )
+        trials = build_warm_start_trials(space, choices, history)
+        if trials.trials:
+            best_loss = min(trials.losses())
+            print(f'Warm-starting {model_class.__name__} with {len(trials.trials)} prior trials')
+
+    executor = None
+    try:
+        folds_context = (
+            fold_executor(X_train, y_train, cv_folds, max_workers=cv_workers)
+            if cv_folds else nullcontext()
+        )
+        with folds_context as executor:
+            best_hyperparameters = fmin(
+                fn=__objective,
+                space=space,
+                algo=tpe.suggest,
+                max_evals=len(trials.trials) + max_evaluations,
+                trials=trials,
+                # A seeded search proposes the same trials again, which the cache answers
+                rstate=np.random.default_rng(random_state) if trial_cache is not None else None,
+            )
+
+        if trial_cache is not None:
+            print(f'{model_class.__name__} {trial_cache.stats()}')
+
+        if isinstance(best_model, str):
+            best_model = joblib.load(best_model)
+    finally:
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
 
     # Convert choice index to choice value
     for key in HYPERPARAMETERS_WITH_CHOICE_INDEX:
@@ -124,9 +405,11 @@ def tune_hyperparameters(
             idx = int(best_hyperparameters[key])
             best_hyperparameters[key] = choices[key][idx]
 
-    for key in ['max_depth', 'max_iter', 'min_samples_leaf', 'min_samples_split', 'n_estimators']:
+    for key in ['max_depth', 'max_iter', 'max_leaf_nodes', 'min_samples_leaf', 'min_samples_split', 'n_estimators']:
         if key in best_hyperparameters:
             best_hyperparameters[key] = int(best_hyperparameters[key])
 
+    if return_best_model:
+        return best_hyperparameters, best_loss, best_model
 
     return best_hyperparameters, best_loss
\ No newline at end of file
@@ -1,6 +1,9 @@
+import glob
 import json
 import os
-from typing import Callable, Dict, Optional, Tuple, Union
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -9,24 +12,43 @@ import xgboost as xgb
 from hyperopt import STATUS_OK, Trials, fmin, hp, tpe
 from hyperopt.pyll import scope
 from sklearn.metrics import mean_squared_error
-from xgboost import Booster, DMatrix
+from xgboost import Booster, DMatrix, QuantileDMatrix
 
+from mlops.utils.fingerprint import dataset_fingerprint
 from mlops.utils.hyperparameters.shared import build_hyperparameters_space
 
 HYPERPARAMETERS_WITH_CHOICE_INDEX = []
 
+# Must match the max_bin used for training (xgboost's default).
+DEFAULT_MAX_BIN = 256
+
+# Prepared matrices keyed by dataset fingerprint, kind, reference cuts and max_bin, least
+# recently used first. Holds the training and validation matrices of the last few datasets.
+PREPARED_DATA_MAXSIZE = 4
+_PREPARED_DATA: 'OrderedDict[str, DMatrix]' = OrderedDict()
+
 
 def fit_model(
     training_set: np.ndarray,
     hyperparameters: Dict,
     verbose_eval: Union[bool, int] = 10,
+    validation_set: Optional[np.ndarray] = None,
+    early_stopping_rounds: Optional[int] = 50,
 ) -> Booster:
     num_boost_round = int(hyperparameters.pop('num_boost_round'))
 
+    if validation_set is None:
+        # Nothing is held out, so train for the full number of rounds without evaluating
+        # the training set against itself.
+        if 'max_depth' in hyperparameters:
+            hyperparameters['max_depth'] = int(hyperparameters['max_depth'])
+
+        return xgb.train(hyperparameters, training_set, num_boost_round=num_boost_round)
+
     model, _, _ = train_model(
         training_set,
-        training_set,
-        early_stopping_rounds=1,
+        validation_set,
+        early_stopping_rounds=early_stopping_rounds,
         hyperparameters=hyperparameters,
         num_boost_round=num_boost_round,
         verbose_eval=verbose_eval,
@@ -41,6 +63,215 @@ def build_data(
     return DMatrix(X, y)
 
 
+def build_quantile_data(
+    X: scipy.sparse._csr.csr_matrix,
+    y: Optional[pd.Series] = None,
+    reference: Optional[QuantileDMatrix] = None,
+    max_bin: int = DEFAULT_MAX_BIN,
+    use_cache: bool = True,
+) -> QuantileDMatrix:
+    """
+    Build a QuantileDMatrix for tree_method='hist' once per dataset and reuse it for every
+    trial and the final fit, so the histogram cuts are only computed once. Validation
+    sets must pass the training QuantileDMatrix as reference to share its cuts.
+    """
+    # A reference only contributes its histogram cuts, so it is keyed by them
+    reference_key = dataset_fingerprint(
+        *reference.get_quantile_cut(),
+    ) if reference is not None else None
+    key = f'{dataset_fingerprint(X, y)}:quantile:{reference_key}:{max_bin}'
+
+    def __build() -> QuantileDMatrix:
+        start = time.perf_counter()
+        data = QuantileDMatrix(X, y, ref=reference, max_bin=max_bin)
+        print(f'Built QuantileDMatrix {X.shape} in {time.perf_counter() - start:.2f}s')
+        return data
+
+    return _prepared(key, __build) if use_cache else __build()
+
+
+def _prepared(key: str, build: Callable[[], DMatrix]) -> DMatrix:
+    if key in _PREPARED_DATA:
+        _PREPARED_DATA.move_to_end(key)
+        return _PREPARED_DATA[key]
+
+    data = _PREPARED_DATA[key] = build()
+    while len(_PREPARED_DATA) > PREPARED_DATA_MAXSIZE:
+        _PREPARED_DATA.popitem(last=False)
+
+    return data
+
+
+def prepare_data(
+    X_train: scipy.sparse._csr.csr_matrix,
+    y_train: pd.Series,
+    X_val: scipy.sparse._csr.csr_matrix,
+    y_val: pd.Series,
+    max_bin: int = DEFAULT_MAX_BIN,
+) -> Tuple[QuantileDMatrix, DMatrix]:
+    """
+    Training QuantileDMatrix and validation DMatrix shared by every trial and the final
+    fit. The validation set is only predicted on, which is much slower on a
+    QuantileDMatrix (xgboost rebuilds feature values from the bins every round).
+    """
+    training_set = build_quantile_data(X_train, y_train, max_bin=max_bin)
+    validation_set = _prepared(
+        f'{dataset_fingerprint(X_val, y_val)}:dmatrix', lambda: build_data(X_val, y_val),
+    )
+
+    return training_set, validation_set
+
+
+def clear_prepared_data() -> None:
+    _PREPARED_DATA.clear()
+
+
+def write_feature_shards(
+    X: scipy.sparse._csr.csr_matrix,
+    y: pd.Series,
+    directory: str,
+    rows_per_shard: int = 100_000,
+) -> List[str]:
+    """
+    Write encoded features to part-NNNNN.npz (CSR) shards with labels in
+    part-NNNNN.label.npy, for training with build_external_data.
+    """
+    os.makedirs(directory, exist_ok=True)
+    y = np.asarray(y, dtype=np.float32)
+
+    paths = []
+    for shard, start in enumerate(range(0, X.shape[0], rows_per_shard)):
+        path = os.path.join(directory, f'part-{shard:05d}.npz')
+        scipy.sparse.save_npz(path, X[start:start + rows_per_shard], compressed=False)
+        np.save(_label_path(path), y[start:start + rows_per_shard])
+        paths.append(path)
+
+    return paths
+
+
+def list_feature_shards(directory: str) -> List[str]:
+    return sorted(
+        path
+        for extension in ('npy', 'npz', 'parquet')
+        for path in glob.glob(os.path.join(directory, f'*.{extension}'))
+        if not path.endswith('.label.npy')
+    )
+
+
+def _label_path(shard_path: str) -> str:
+    return f'{os.path.splitext(shard_path)[0]}.label.npy'
+
+
+def load_feature_shard(
+    shard_path: str, label_column: str = 'duration_minutes',
+) -> Tuple[Union[np.ndarray, scipy.sparse.csr_matrix, pd.DataFrame], np.ndarray]:
+    if shard_path.endswith('.parquet'):
+        df = pd.read_parquet(shard_path)
+        return df.drop(columns=[label_column]), df[label_column].to_numpy()
+
+    if shard_path.endswith('.npz'):
+        X = scipy.sparse.load_npz(shard_path).tocsr()
+    else:
+        X = np.load(shard_path, mmap_mode='r')
+
+    return X, np.load(_label_path(shard_path))
+
+
+class FeatureShardIterator(xgb.DataIter):
+    """
+    Feeds on-disk feature shards to XGBoost one at a time, so the full matrix never has
+    to be held in memory. Shards are Parquet files with a label column, or .npy (dense) /
+    .npz (CSR) feature files with labels in a sibling .label.npy file.
+    """
+
+    def __init__(
+        self,
+        shard_paths: List[str],
+        cache_prefix: str,
+        label_column: str = 'duration_minutes',
+    ):
+        self._shard_paths = list(shard_paths)
+        self._label_column = label_column
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data: Callable) -> int:
+        if self._index == len(self._shard_paths):
+            return 0
+
+        X, y = load_feature_shard(self._shard_paths[self._index], self._label_column)
+        input_data(data=X, label=y)
+        self._index += 1
+
+        return 1
+
+    def reset(self) -> None:
+        self._index = 0
+
+
+def build_external_data(
+    shard_paths: List[str],
+    cache_dir: str,
+    label_column: str = 'duration_minutes',
+) -> DMatrix:
+    """
+    External-memory DMatrix over feature shards. XGBoost pages the data through
+    cache files under cache_dir. The result can be passed to train_model,
+    fit_model and tune_hyperparameters like an in-memory DMatrix.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    iterator = FeatureShardIterator(
+        shard_paths,
+        cache_prefix=os.path.join(cache_dir, 'cache'),
+        label_column=label_column,
+    )
+
+    return DMatrix(iterator)
+
+
+class MedianPruningCallback(xgb.callback.TrainingCallback):
+    """
+    Median stopping rule: every check_every rounds (after warmup_rounds), stop the trial
+    if its best validation score so far is worse than the median best-so-far of the
+    completed trials at the same round. Needs at least min_trials completed curves.
+    """
+
+    def __init__(
+        self,
+        completed_curves: List[List[float]],
+        check_every: int = 25,
+        warmup_rounds: int = 50,
+        min_trials: int = 5,
+        data_name: str = 'validation',
+        metric_name: str = 'rmse',
+    ):
+        super().__init__()
+        self.completed_curves = completed_curves
+        self.check_every = check_every
+        self.warmup_rounds = warmup_rounds
+        self.min_trials = min_trials
+        self.data_name = data_name
+        self.metric_name = metric_name
+        self.curve: List[float] = []
+        self.pruned_at: Optional[int] = None
+
+    def after_iteration(self, model: Booster, epoch: int, evals_log: Dict) -> bool:
+        self.curve = evals_log[self.data_name][self.metric_name]
+
+        if epoch < self.warmup_rounds or (epoch + 1) % self.check_every:
+            return False
+        if len(self.completed_curves) < self.min_trials:
+            return False
+
+        # Trials that stopped early before this round keep their final best score.
+        median = np.median([min(curve[:epoch + 1]) for curve in self.completed_curves])
+        if min(self.curve) > median:
+            self.pruned_at = epoch
+            return True
+
+        return False
+
+
 def train_model(
     training_set: np.ndarray,
     validation_set: np.ndarray,
@@ -48,6 +279,7 @@ def train_model(
     hyperparameters: Dict = {},
     num_boost_round: int = 1000,
     verbose_eval: Union[bool, int] = 10,
+    callbacks: Optional[List[xgb.callback.TrainingCallback]] = None,
 ) -> Tuple[Booster, Dict[str, float], np.ndarray]:
     if 'max_depth' in hyperparameters:
         hyperparameters['max_depth'] = int(hyperparameters['max_depth'])
@@ -55,6 +287,7 @@ def train_model(
     model = xgb.train(
         hyperparameters,
         training_set,
+        callbacks=callbacks,
         early_stopping_rounds=early_stopping_rounds,
         evals=[(validation_set, 'validation')],
         num_boost_round=num_boost_round,
@@ -64,8 +297,8 @@ def train_model(
     y_pred = model.predict(validation_set)
 
     y_val = validation_set.get_label()  # Corrected to extract labels from DMatrix
-    rmse = mean_squared_error(y_val, y_pred, squared=False)
-    mse = mean_squared_error(y_val, y_pred, squared=True)
+    mse = mean_squared_error(y_val, y_pred)
+    rmse = np.sqrt(mse)
 
     return model, dict(mse=mse, rmse=rmse), y_pred
 
@@ -79,8 +312,24 @@ def tune_hyperparameters(
     random_state: int = 42,
     verbose_eval: int = 10,
     verbosity: int = 1,
+    prune: bool = False,
+    prune_check_every: int = 25,
+    prune_warmup_rounds: int = 50,
+    prune_min_trials: int = 5,
     **kwargs,
 ) -> Dict:
+    """
+    prune:
+        Abort trials whose validation curve falls behind the median of the completed
+        trials (see MedianPruningCallback). Pruned trials keep the RMSE reached when they
+        were stopped as their loss, are marked pruned=True in the hyperopt result and
+        report pruned/pruned_at_round metrics and a pruned tag to the callback.
+    Every trial reports the number of rounds it trained for as stopped_at_round.
+    """
+    trial_seconds = []
+    pruned_trials: List[int] = []
+    completed_curves: List[List[float]] = []
+
     def __objective(
         params: Dict,
         early_stopping_rounds=early_stopping_rounds,
@@ -92,6 +341,14 @@ def tune_hyperparameters(
         # hyperparameter but instead a parameter of the train function.
         num_boost_round = int(params.pop('num_boost_round'))
 
+        pruning = MedianPruningCallback(
+            completed_curves,
+            check_every=prune_check_every,
+            warmup_rounds=prune_warmup_rounds,
+            min_trials=prune_min_trials,
+        ) if prune else None
+
+        start = time.perf_counter()
         model, metrics, predictions = train_model(
             training_set,
             validation_set,
@@ -99,7 +356,24 @@ def tune_hyperparameters(
             hyperparameters={**params, **dict(verbosity=verbosity)},
             num_boost_round=num_boost_round,
             verbose_eval=verbose_eval,
+            callbacks=[pruning] if pruning else None,
         )
+        metrics['trial_seconds'] = time.perf_counter() - start
+        metrics['stopped_at_round'] = model.num_boosted_rounds()
+
+        tags = {}
+        pruned = pruning is not None and pruning.pruned_at is not None
+        if pruning is not None:
+            metrics['pruned'] = float(pruned)
+            tags['pruned'] = str(pruned).lower()
+            if pruned:
+                metrics['pruned_at_round'] = pruning.pruned_at
+                pruned_trials.append(pruning.pruned_at)
+                print(f'Pruned trial at round {pruning.pruned_at}')
+            else:
+                completed_curves.append(list(pruning.curve))
+        trial_seconds.append(metrics['trial_seconds'])
+        print(f"Trial {len(trial_seconds)}: rmse={metrics['rmse']:.4f} in {metrics['trial_seconds']:.2f}s")
 
         if callback:
             callback(
@@ -107,9 +381,10 @@ def tune_hyperparameters(
                 metrics=metrics,
                 model=model,
                 predictions=predictions,
+                **({'tags': tags} if tags else {}),
             )
 
-        return dict(loss=metrics['rmse'], status=STATUS_OK)
+        return dict(loss=metrics['rmse'], status=STATUS_OK, pruned=pruned)
 
     space, choices = build_hyperparameters_space(Booster, random_state=random_state)
 
@@ -121,6 +396,11 @@ def tune_hyperparameters(
         trials=Trials(),
     )
 
+    if trial_seconds:
+        print(f'Mean trial time: {np.mean(trial_seconds):.2f}s over {len(trial_seconds)} trials')
+    if prune:
+        print(f'Pruned {len(pruned_trials)} of {len(trial_seconds)} trials')
+
     # Convert choice index to choice value.
     for key in HYPERPARAMETERS_WITH_CHOICE_INDEX:
         if key in best_hyperparameters and key in choices:
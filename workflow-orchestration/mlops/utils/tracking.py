@@ -0,0 +1,523 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import mlflow
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from mlflow import MlflowClient
+from mlflow.data import from_pandas
+from mlflow.entities import Dataset, DatasetInput, InputTag, Metric, Param, Run, RunTag
+from mlflow.exceptions import MlflowException
+from mlflow.models import infer_signature
+from mlflow.sklearn import log_model as log_model_sklearn, save_model as save_model_sklearn
+from mlflow.utils.time import get_current_time_millis
+from mlflow.xgboost import log_model as log_model_xgboost, save_model as save_model_xgboost
+from scipy.sparse import spmatrix
+from sklearn.base import BaseEstimator
+
+from mlops.utils.artifact_store import content_root, log_content_addressed, stage_content, tag_content
+from mlops.utils.custom_models.packaging import project_code_paths
+from mlops.utils.fingerprint import array_fingerprint
+
+if TYPE_CHECKING:
+    from mlops.utils.artifact_uploader import ArtifactUploader
+
+DEFAULT_DEVELOPER = os.getenv('EXPERIMENTS_DEVELOPER', 'Dario')
+
+# A log_batch request holds at most 1000 entities, of which at most 100 params and 100 tags.
+MAX_BATCH_METRICS = 800
+MAX_BATCH_PARAMS = 100
+MAX_BATCH_TAGS = 100
+
+
+@dataclass(frozen=True)
+class TrackingBackend:
+    tracking_uri: str
+    experiment_name: str
+    artifact_root: Optional[str] = None
+    # Model classes registered under registered_model_name; None registers any model.
+    registered_model_classes: Optional[Tuple[str, ...]] = None
+
+
+BACKENDS: Dict[str, TrackingBackend] = {
+    'local': TrackingBackend(
+        tracking_uri='file:./mlruns',
+        experiment_name='chicago-taxi-experiment',
+    ),
+    'sqlite': TrackingBackend(
+        tracking_uri='sqlite:///mlflow.db',
+        experiment_name='chicago-taxi-experiment',
+        # Set a custom artifact location (same as mlflow server config)
+        artifact_root=os.getenv('MLFLOW_ARTIFACT_ROOT', './mlartifacts'),
+    ),
+    's3': TrackingBackend(
+        tracking_uri=os.getenv('MLFLOW_TRACKING_URI', 'http://127.0.0.1:5000'),  # MLflow server with S3
+        experiment_name='chicago-taxi-experiment-s3',
+        artifact_root='s3://dario-mlflow-models-storage/models',
+        registered_model_classes=('RandomForestRegressor',),
+    ),
+}
+
+
+# Cumulative (calls, seconds) per tracking operation, for the whole process.
+_TIMINGS: Dict[str, list] = defaultdict(lambda: [0, 0.0])
+_TIMINGS_LOCK = threading.Lock()
+
+
+@contextmanager
+def timed(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _TIMINGS_LOCK:
+            _TIMINGS[operation][0] += 1
+            _TIMINGS[operation][1] += time.perf_counter() - start
+
+
+def tracking_timings() -> Dict[str, Dict[str, float]]:
+    with _TIMINGS_LOCK:
+        return {
+            operation: dict(calls=calls, seconds=seconds, ms_per_call=seconds * 1000 / max(calls, 1))
+            for operation, (calls, seconds) in _TIMINGS.items()
+        }
+
+
+def reset_tracking_timings() -> None:
+    with _TIMINGS_LOCK:
+        _TIMINGS.clear()
+
+
+@lru_cache(maxsize=None)
+def get_client(tracking_uri: str) -> MlflowClient:
+    """
+    One long-lived client per tracking URI. Against a tracking server, MLflow keeps a
+    pooled HTTP session per host, so reusing the client keeps its connections warm;
+    against SQLite, the store and its connection pool are created once.
+    """
+    return MlflowClient(tracking_uri=tracking_uri)
+
+
+_EXPERIMENT_IDS: Dict[Tuple[str, str], str] = {}
+_REGISTERED_MODELS: set = set()
+_CACHE_LOCK = threading.Lock()
+
+
+def setup_experiment(
+    experiment_name: str,
+    tracking_uri: str,
+    artifact_root: Optional[str] = None,
+) -> Tuple[MlflowClient, str]:
+    """
+    Client and experiment id, creating the experiment on first use. The id is resolved
+    once per process instead of on every tracked run.
+    """
+    mlflow.set_tracking_uri(tracking_uri)
+    client = get_client(tracking_uri)
+
+    key = (tracking_uri, experiment_name)
+    with _CACHE_LOCK:
+        if key not in _EXPERIMENT_IDS:
+            with timed('get_experiment'):
+                experiment = client.get_experiment_by_name(experiment_name)
+
+            if experiment:
+                _EXPERIMENT_IDS[key] = experiment.experiment_id
+            else:
+                with timed('create_experiment'):
+                    _EXPERIMENT_IDS[key] = client.create_experiment(
+                        experiment_name,
+                        artifact_location=artifact_root,
+                    )
+
+    return client, _EXPERIMENT_IDS[key]
+
+
+def forget_experiment(experiment_name: str, tracking_uri: str) -> None:
+    with _CACHE_LOCK:
+        _EXPERIMENT_IDS.pop((tracking_uri, experiment_name), None)
+
+
+def ensure_registered_model(client: MlflowClient, name: str) -> None:
+    key = (id(client), name)  # clients are cached per tracking URI
+    with _CACHE_LOCK:
+        if key in _REGISTERED_MODELS:
+            return
+
+        with timed('get_registered_model'):
+            try:
+                client.get_registered_model(name)
+            except MlflowException:
+                client.create_registered_model(name)
+        _REGISTERED_MODELS.add(key)
+
+
+def log_run_data(
+    client: MlflowClient,
+    run_id: str,
+    params: Dict[str, Union[float, int, str]],
+    metrics: Dict[str, float],
+    tags: Dict[str, str],
+    batched: bool = True,
+    synchronous: bool = True,
+) -> float:
+    """
+    Log params, metrics and tags of a run in as few log_batch requests as possible
+    (one for a typical run) instead of one request per key. With synchronous=False the
+    writes are queued and flushed by MLflow in the background.
+    batched=False keeps the per-key calls, to compare the overhead.
+
+    Returns the seconds spent by the calling thread.
+    """
+    start = time.perf_counter()
+
+    if not batched:
+        with timed('log_per_key'):
+            for key, value in tags.items():
+                client.set_tag(run_id, key, value)
+            for key, value in params.items():
+                client.log_param(run_id, key, value)
+            for key, value in metrics.items():
+                client.log_metric(run_id, key, value)
+
+        return time.perf_counter() - start
+
+    timestamp = get_current_time_millis()
+    pending_params = [Param(key, str(value)) for key, value in params.items()]
+    pending_metrics = [Metric(key, float(value), timestamp, 0) for key, value in metrics.items()]
+    pending_tags = [RunTag(key, str(value)) for key, value in tags.items()]
+
+    while pending_params or pending_metrics or pending_tags:
+        with timed('log_batch'):
+            client.log_batch(
+                run_id,
+                metrics=pending_metrics[:MAX_BATCH_METRICS],
+                params=pending_params[:MAX_BATCH_PARAMS],
+                tags=pending_tags[:MAX_BATCH_TAGS],
+                synchronous=synchronous,
+            )
+        pending_metrics = pending_metrics[MAX_BATCH_METRICS:]
+        pending_params = pending_params[MAX_BATCH_PARAMS:]
+        pending_tags = pending_tags[MAX_BATCH_TAGS:]
+
+    return time.perf_counter() - start
+
+
+def transition_stage(
+    client: MlflowClient,
+    registered_model_name: str,
+    version: str,
+    stage: str,
+    verbosity: Union[bool, int] = False,
+) -> None:
+    if stage.lower() not in ["production", "staging"]:
+        return
+
+    with timed('transition_stage'):
+        client.transition_model_version_stage(
+            name=registered_model_name,
+            version=str(version),
+            stage=stage.capitalize(),
+            archive_existing_versions=True,
+        )
+    if verbosity:
+        print(f"Model {registered_model_name} transitioned to {stage.capitalize()}")
+
+
+def register_model_version(
+    client: MlflowClient,
+    run: Run,
+    registered_model_name: str,
+    register_stage: str = "None",
+    verbosity: Union[bool, int] = False,
+) -> None:
+    """
+    Register the run's model artifact as a new version and move it to register_stage.
+    """
+    ensure_registered_model(client, registered_model_name)
+    with timed('create_model_version'):
+        version = client.create_model_version(
+            registered_model_name,
+            source=f"{run.info.artifact_uri}/model",
+            run_id=run.info.run_id,
+        )
+    transition_stage(client, registered_model_name, version.version, register_stage, verbosity)
+
+
+def queue_run_artifacts(
+    uploader: 'ArtifactUploader',
+    client: MlflowClient,
+    run: Run,
+    model: Union[BaseEstimator, xgb.Booster],
+    dict_vectorizer: Optional[object] = None,
+    registered_model_name: Optional[str] = None,
+    register_stage: str = "None",
+    verbosity: Union[bool, int] = False,
+    **save_options,
+) -> None:
+    """
+    Write the model, and the dict vectorizer for the content store, to local directories
+    and hand them to the uploader.
+    The run stays RUNNING until both uploads are confirmed; only then is the model version
+    registered and the run marked FINISHED (FAILED if an upload fails).
+    """
+    run_id = run.info.run_id
+    local_dir = tempfile.mkdtemp(prefix=f"{run_id}-")
+
+    # Usually already in the content store, so the upload is only a lookup; the run is
+    # tagged with it once it is there
+    vectorizer_upload = None
+    if dict_vectorizer is not None:
+        staging_dir = tempfile.mkdtemp(prefix=f"{run_id}-cas-")
+        with timed('stage_vectorizer'):
+            digest = stage_content(dict_vectorizer, staging_dir)
+        root = content_root(client, run.info.experiment_id)
+        vectorizer_upload = uploader.upload(
+            staging_dir,
+            root,
+            on_complete=lambda: tag_content(client, run_id, "dict_vectorizer", f"{root}/{digest[:2]}/{digest}"),
+            skip_existing=True,
+        )
+
+    save_model = save_model_sklearn if isinstance(model, BaseEstimator) else save_model_xgboost
+    with timed('save_model'), project_code_paths(model) as code_paths:
+        save_model(model, os.path.join(local_dir, "model"), code_paths=code_paths, **save_options)
+
+    def __on_complete() -> None:
+        # Queued first, so it is done or running on another worker
+        if vectorizer_upload is not None:
+            vectorizer_upload.result()
+
+        if registered_model_name:
+            register_model_version(client, run, registered_model_name, register_stage, verbosity)
+
+        client.set_terminated(run_id, "FINISHED")
+        if verbosity:
+            print(f"Uploaded artifacts of run {run_id}")
+
+    def __on_error(error: BaseException) -> None:
+        client.set_terminated(run_id, "FAILED")
+        print(f"Artifact upload of run {run_id} failed: {error}")
+
+    uploader.upload(local_dir, run.info.artifact_uri, on_complete=__on_complete, on_error=__on_error)
+
+
+def compact_dataset(
+    dataset: Union[spmatrix, np.ndarray],
+    name: str,
+    source: Optional[Dict[str, str]] = None,
+) -> Dataset:
+    """
+    Dataset entity holding the fingerprint, schema and summary stats of a CSR matrix or
+    array instead of its contents, computed in one chunked pass without copying it.
+    """
+    digest, schema, profile = array_fingerprint(dataset)
+
+    return Dataset(
+        name=name,
+        digest=digest,
+        source_type='code',
+        source=json.dumps(source or {}),
+        schema=json.dumps(schema),
+        profile=json.dumps(profile),
+    )
+
+
+def track_run(
+    backend: TrackingBackend,
+    experiment_name: Optional[str] = None,
+    block_uuid: Optional[str] = None,
+    developer: Optional[str] = None,
+    hyperparameters: Dict[str, Union[float, int, str]] = {},
+    metrics: Dict[str, float] = {},
+    model: Optional[Union[BaseEstimator, xgb.Booster]] = None,
+    partition: Optional[str] = None,
+    pipeline_uuid: Optional[str] = None,
+    predictions: Optional[np.ndarray] = None,
+    run_name: Optional[str] = None,
+    tracking_uri: Optional[str] = None,
+    training_set: Optional[Union[pd.DataFrame, spmatrix]] = None,
+    training_targets: Optional[pd.Series] = None,
+    track_datasets: bool = False,
+    validation_set: Optional[Union[pd.DataFrame, spmatrix]] = None,
+    validation_targets: Optional[pd.Series] = None,
+    verbosity: Union[bool, int] = False,
+    dict_vectorizer: Optional[object] = None,
+    tags: Optional[Dict[str, str]] = None,
+    batch_logging: bool = True,
+    async_logging: bool = False,
+    uploader: Optional['ArtifactUploader'] = None,
+    registered_model_name: Optional[str] = None,
+    register_stage: str = "None",
+    **kwargs,
+) -> Run:
+    """
+    Create a run on the backend with its params, metrics, tags, datasets, vectorizer
+    and model. The model is registered as registered_model_name when its class is one of
+    the backend's registered_model_classes, and moved to register_stage if that is
+    Production or Staging.
+    """
+    experiment_name = experiment_name or backend.experiment_name
+    tracking_uri = tracking_uri or backend.tracking_uri
+
+    client, experiment_id = setup_experiment(experiment_name, tracking_uri, backend.artifact_root)
+
+    if not run_name:
+        run_name = ':'.join(
+            [str(s) for s in [pipeline_uuid, partition, block_uuid] if s]
+        )
+
+    try:
+        with timed('create_run'):
+            run = client.create_run(experiment_id, run_name=run_name or None)
+    except MlflowException:
+        # The cached id may be stale, e.g. the experiment was deleted and recreated
+        forget_experiment(experiment_name, tracking_uri)
+        client, experiment_id = setup_experiment(experiment_name, tracking_uri, backend.artifact_root)
+        with timed('create_run'):
+            run = client.create_run(experiment_id, run_name=run_name or None)
+    run_id = run.info.run_id
+
+    run_tags = {
+        key: value
+        for key, value in [
+            ('developer', developer or DEFAULT_DEVELOPER),
+            ('model', model.__class__.__name__),
+            *(tags or {}).items(),
+        ]
+        if value is not None
+    }
+
+    params = {
+        key: value
+        for key, value in [
+            ('block_uuid', block_uuid),
+            ('partition', partition),
+            ('pipeline_uuid', pipeline_uuid),
+        ]
+        if value is not None
+    }
+    params.update(hyperparameters)
+
+    # Params, metrics and tags go out in a single batch instead of one request per key
+    elapsed = log_run_data(
+        client,
+        run_id,
+        params=params,
+        metrics=metrics,
+        tags=run_tags,
+        batched=batch_logging,
+        synchronous=not async_logging,
+    )
+
+    if verbosity:
+        for key, value in hyperparameters.items():
+            print(f'Logged hyperparameter {key}: {value}.')
+        for key, value in metrics.items():
+            print(f'Logged metric {key}: {value}.')
+        print(
+            f'Logged {len(params)} params, {len(metrics)} metrics and {len(run_tags)} tags '
+            f'in {elapsed * 1000:.1f} ms ({"batched" if batch_logging else "per key"}'
+            f'{", async" if async_logging else ""}).'
+        )
+
+    dataset_inputs = []
+    if track_datasets:
+        for dataset_name, dataset, dataset_tags in [
+            ('dataset', training_set, dict(context='training')),
+            ('targets', training_targets.to_numpy() if training_targets is not None else None, dict(context='training')),
+            ('dataset', validation_set, dict(context='validation')),
+            ('targets', validation_targets.to_numpy() if validation_targets is not None else None, dict(context='validation')),
+            ('predictions', predictions, dict(context='training')),
+        ]:
+            if dataset is None:
+                continue
+
+            if isinstance(dataset, pd.DataFrame):
+                ds = from_pandas(dataset, name=dataset_name)._to_mlflow_entity()
+            elif isinstance(dataset, (spmatrix, np.ndarray)):
+                # Sparse training matrices and arrays are logged by fingerprint and profile
+                ds = compact_dataset(dataset, dataset_name, source=dict(run_name=run_name))
+            else:
+                continue
+
+            ds_input = DatasetInput(ds, tags=[InputTag(k, v) for k, v in dataset_tags.items()])
+            dataset_inputs.append(ds_input)
+
+        if len(dataset_inputs) >= 1:
+            with timed('log_inputs'):
+                client.log_inputs(run_id, dataset_inputs)
+
+    if not model:
+        return run
+
+    should_register = registered_model_name is not None and (
+        backend.registered_model_classes is None
+        or model.__class__.__name__ in backend.registered_model_classes
+    )
+
+    opts = dict(input_example=training_set.head(1) if isinstance(training_set, pd.DataFrame) else None)
+    if training_set is not None and predictions is not None:
+        try:
+            opts['signature'] = infer_signature(training_set, predictions)
+        except Exception:
+            pass
+
+    # Upload in the background when an uploader is given; the run is finished by it
+    if uploader is not None and urlparse(run.info.artifact_uri).scheme == 's3':
+        queue_run_artifacts(
+            uploader,
+            client,
+            run,
+            model,
+            dict_vectorizer=dict_vectorizer,
+            registered_model_name=registered_model_name if should_register else None,
+            register_stage=register_stage,
+            verbosity=verbosity,
+            **opts,
+        )
+        return run
+
+    with mlflow.start_run(run_id=run_id):
+        # Store dict_vectorizer once per content, referenced from the run by its hash
+        if dict_vectorizer is not None:
+            with timed('log_vectorizer'):
+                digest = log_content_addressed(client, run_id, dict_vectorizer, "dict_vectorizer")
+            if verbosity:
+                print(f"Logged dict_vectorizer as sha256:{digest[:12]}")
+
+        # Log the model (sklearn or xgboost)
+        log_model = log_model_sklearn if isinstance(model, BaseEstimator) else log_model_xgboost
+        # Models defined in this project ship their code, the serving apps do not have it
+        with timed('log_model'), project_code_paths(model) as code_paths:
+            log_model(
+                model,
+                artifact_path='model',
+                code_paths=code_paths,
+                **opts
+            )
+
+        if verbosity:
+            print(f'Logged model: {model.__class__.__name__}')
+
+        # Registered like the uploader does, so the registered model lookup is cached
+        if should_register:
+            register_model_version(client, run, registered_model_name, register_stage, verbosity)
+
+    if verbosity:
+        print('Tracking timings: ' + ', '.join(
+            f"{operation}={timing['ms_per_call']:.1f}ms x{timing['calls']}"
+            for operation, timing in tracking_timings().items()
+        ))
+
+    return run
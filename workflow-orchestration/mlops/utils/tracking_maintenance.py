@@ -0,0 +1,255 @@
+"""
+Maintenance of the SQLite tracking store (mlflow.db).
+
+    python -m mlops.utils.tracking_maintenance --db mlflow.db \
+        --older-than-days 90 --archive-dir archive/
+
+- Enables WAL mode, so parallel tuning trials writing runs no longer hit
+  'database is locked' while the dashboard reads.
+- Adds covering indexes for the analytics dashboard query.
+- With --older-than-days, runs older than that are compacted: their metric history is
+  trimmed to the latest value of each metric. With --archive-dir, they are archived
+  instead: rows are copied to <archive-dir>/runs.db, local artifact directories to
+  <archive-dir>/artifacts/<run_uuid>.tar.gz, then the runs are deleted and garbage
+  collected with `mlflow gc`. Runs of registered model versions are never archived.
+- Checkpoints the WAL and VACUUMs the database.
+
+DB size and dashboard query time are reported before and after. Stop the MLflow server
+before running it: VACUUM needs exclusive access.
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tarfile
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from mlflow import MlflowClient
+
+from mlops.utils.analytics.data import QUERY as DASHBOARD_QUERY
+from mlops.utils.tracking import BACKENDS
+
+DEFAULT_DB = BACKENDS['sqlite'].tracking_uri.split('/')[-1]
+DEFAULT_ARTIFACT_ROOT = BACKENDS['sqlite'].artifact_root
+
+# Covering indexes of the dashboard query: the tag filter, the metric pivot and the
+# start_time range of incremental loads are answered from the index alone.
+INDEXES = {
+    'idx_tags_key_value_run': 'tags (key, value, run_uuid)',
+    'idx_latest_metrics_run_key_value': 'latest_metrics (run_uuid, key, value)',
+    'idx_runs_start_time_run': 'runs (start_time, run_uuid)',
+}
+
+# Tables holding rows of a run, copied to the archive database
+ARCHIVED_TABLES = ('runs', 'params', 'tags', 'metrics', 'latest_metrics')
+
+
+def database_size(path: str) -> int:
+    return sum(
+        os.path.getsize(file) for file in (path, f'{path}-wal') if os.path.exists(file)
+    )
+
+
+def query_time(conn: sqlite3.Connection, repeat: int = 5) -> float:
+    """
+    Best of repeat full dashboard loads, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(DASHBOARD_QUERY, dict(since=0, offset=0)).fetchall()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def measure(path: str) -> Dict[str, float]:
+    with sqlite3.connect(path) as conn:
+        return dict(size_mb=database_size(path) / 1024 ** 2, query_ms=query_time(conn) * 1000)
+
+
+def enable_wal(conn: sqlite3.Connection) -> str:
+    # Persistent: stored in the database file, every later connection uses it
+    return conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    for name, columns in INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {columns}')
+    conn.execute('ANALYZE')
+    conn.commit()
+
+
+def old_runs(conn: sqlite3.Connection, older_than_days: int, protect_registered: bool) -> List[str]:
+    cutoff = int((time.time() - older_than_days * 86400) * 1000)
+    query = 'SELECT run_uuid FROM runs WHERE start_time < ?'
+    if protect_registered:
+        query += ' AND run_uuid NOT IN (SELECT run_id FROM model_versions WHERE run_id IS NOT NULL)'
+
+    return [row[0] for row in conn.execute(query, (cutoff,))]
+
+
+def _select_runs(conn: sqlite3.Connection, run_uuids: List[str]) -> None:
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS selected_runs (run_uuid TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM selected_runs')
+    conn.executemany('INSERT INTO selected_runs VALUES (?)', [(run_uuid,) for run_uuid in run_uuids])
+
+
+def compact_runs(conn: sqlite3.Connection, run_uuids: List[str]) -> int:
+    """
+    Trim the metric history of runs to the latest value of each metric, which is all
+    the dashboard and run comparisons read. Returns the number of deleted rows.
+    """
+    _select_runs(conn, run_uuids)
+    deleted = conn.execute(
+        """
+        DELETE FROM metrics
+        WHERE run_uuid IN (SELECT run_uuid FROM selected_runs)
+            AND NOT EXISTS (
+                SELECT 1 FROM latest_metrics
+                WHERE latest_metrics.run_uuid = metrics.run_uuid
+                    AND latest_metrics.key = metrics.key
+                    AND latest_metrics.step = metrics.step
+                    AND latest_metrics.timestamp = metrics.timestamp
+            )
+        """
+    ).rowcount
+    conn.commit()
+
+    return deleted
+
+
+def artifact_directory(artifact_uri: str, artifact_root: str) -> Optional[str]:
+    """
+    Local directory of a run (parent of its artifacts/ folder), or None when its
+    artifacts are stored remotely (S3).
+    """
+    parsed = urlparse(artifact_uri)
+    if parsed.scheme in ('', 'file'):
+        path = parsed.path if parsed.scheme else artifact_uri
+    elif parsed.scheme == 'mlflow-artifacts':
+        # Proxied by the tracking server, stored under its --artifacts-destination
+        path = os.path.join(artifact_root, parsed.path.lstrip('/'))
+    else:
+        return None
+
+    return os.path.dirname(path.rstrip('/'))
+
+
+def archive_runs(
+    conn: sqlite3.Connection,
+    run_uuids: List[str],
+    archive_dir: str,
+    artifact_root: str,
+) -> int:
+    """
+    Copy the rows of runs to <archive_dir>/runs.db and their local artifact directories
+    to <archive_dir>/artifacts/. Returns the number of archived artifact directories.
+    """
+    os.makedirs(os.path.join(archive_dir, 'artifacts'), exist_ok=True)
+
+    _select_runs(conn, run_uuids)
+    conn.execute('ATTACH DATABASE ? AS archive', (os.path.join(archive_dir, 'runs.db'),))
+    try:
+        for table in ARCHIVED_TABLES:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0')
+            conn.execute(
+                f'INSERT INTO archive.{table} SELECT * FROM main.{table} '
+                'WHERE run_uuid IN (SELECT run_uuid FROM selected_runs)'
+            )
+        conn.commit()
+    finally:
+        conn.execute('DETACH DATABASE archive')
+
+    archived = 0
+    for run_uuid, artifact_uri in conn.execute(
+        'SELECT run_uuid, artifact_uri FROM runs WHERE run_uuid IN (SELECT run_uuid FROM selected_runs)'
+    ).fetchall():
+        directory = artifact_directory(artifact_uri or '', artifact_root)
+        if directory and os.path.isdir(directory):
+            with tarfile.open(os.path.join(archive_dir, 'artifacts', f'{run_uuid}.tar.gz'), 'w:gz') as tar:
+                tar.add(directory, arcname=run_uuid)
+            archived += 1
+
+    return archived
+
+
+def delete_runs(db: str, run_uuids: List[str], tracking_uri: Optional[str] = None) -> None:
+    """
+    Delete runs, then remove them and their artifacts for good with `mlflow gc`.
+    Runs logged through a tracking server need its tracking_uri to reach their artifacts.
+    """
+    backend_store_uri = f'sqlite:///{db}'
+    client = MlflowClient(tracking_uri=backend_store_uri)
+    for run_uuid in run_uuids:
+        if client.get_run(run_uuid).info.lifecycle_stage != 'deleted':
+            client.delete_run(run_uuid)
+
+    command = [sys.executable, '-m', 'mlflow', 'gc', '--backend-store-uri', backend_store_uri]
+    if tracking_uri:
+        command += ['--tracking-uri', tracking_uri]
+    subprocess.run(command + ['--run-ids', ','.join(run_uuids)], check=True)
+
+
+def vacuum(conn: sqlite3.Connection) -> None:
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.execute('VACUUM')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Index, compact and archive the SQLite MLflow tracking store.')
+    parser.add_argument('--db', default=DEFAULT_DB, help='Path of the SQLite tracking database')
+    parser.add_argument('--older-than-days', type=int, help='Compact (or archive) runs older than this')
+    parser.add_argument('--archive-dir', help='Archive old runs here and delete them, instead of compacting')
+    parser.add_argument('--artifact-root', default=DEFAULT_ARTIFACT_ROOT, help='Local artifact root of the runs')
+    parser.add_argument('--tracking-uri', help='Tracking server of runs with mlflow-artifacts:/ URIs, for mlflow gc')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the runs that would be compacted or archived')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f'{args.db} does not exist')
+
+    before = measure(args.db)
+
+    # Autocommit, VACUUM cannot run inside a transaction
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        run_uuids = []
+        if args.older_than_days is not None:
+            run_uuids = old_runs(conn, args.older_than_days, protect_registered=bool(args.archive_dir))
+            action = 'archive' if args.archive_dir else 'compact'
+            print(f'{len(run_uuids)} runs older than {args.older_than_days} days to {action}')
+
+            if args.dry_run:
+                for run_uuid in run_uuids:
+                    print(f'  {run_uuid}')
+                return
+
+        print(f'Journal mode: {enable_wal(conn)}')
+        create_indexes(conn)
+        print(f'Indexes: {", ".join(INDEXES)}')
+
+        if run_uuids and args.archive_dir:
+            archived = archive_runs(conn, run_uuids, args.archive_dir, args.artifact_root)
+            print(f'Archived {len(run_uuids)} runs ({archived} artifact directories) to {args.archive_dir}')
+            delete_runs(args.db, run_uuids, args.tracking_uri)
+        elif run_uuids:
+            print(f'Deleted {compact_runs(conn, run_uuids)} metric history rows')
+
+        vacuum(conn)
+    finally:
+        conn.close()
+
+    after = measure(args.db)
+
+    print(f"{'':<12}{'before':>12}{'after':>12}")
+    print(f"{'size (MB)':<12}{before['size_mb']:>12.2f}{after['size_mb']:>12.2f}")
+    print(f"{'query (ms)':<12}{before['query_ms']:>12.2f}{after['query_ms']:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()